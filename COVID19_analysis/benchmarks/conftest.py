@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+    conftest.py for the covid19_analysis benchmarks.
+
+    Run with: pytest benchmarks (requires pytest-benchmark), compare runs with
+    --benchmark-autosave / --benchmark-compare. Peak memory of each benchmarked
+    call is stored in the extra_info of the results (peak_memory_kb).
+"""
+
+import os
+import importlib.util
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Synthetic datasets builders of the unit tests (tests/conftest.py, loaded by path as both files are named conftest)
+_spec = importlib.util.spec_from_file_location(
+    'covid19_tests_conftest', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'conftest.py'))
+test_data = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(test_data)
+
+# Synthetic datasets sizes: global file (regions x dates) & US counties file (counties x dates)
+N_DATES = 1000
+N_GLOBAL = 300
+N_US = 3300
+
+
+# Build a JHU shaped wide dataframe (Province/State, Country/Region, Lat, Long, dates...)
+def make_jhu_frame(regions, n_dates=N_DATES, seed=0):
+    '''Synthetic JHU dataset with increasing cumulative counts for each (Province/State, Country/Region)'''
+    rng = np.random.RandomState(seed)
+    values = np.cumsum(rng.randint(0, 50, size=(len(regions), n_dates)), axis=1)
+    return test_data.jhu_frame(regions, values, rng)
+
+
+# Global layout: ~190 single row countries, a few countries with provinces (with & without mainland)
+def global_regions(n_regions=N_GLOBAL):
+    regions = [(np.nan, 'France')] + [('Overseas %d' % i, 'France') for i in range(10)]
+    regions += [('Province %d' % i, 'China') for i in range(33)]
+    regions += [(np.nan, 'Canada')] + [('Province %d' % i, 'Canada') for i in range(12)]
+    regions += [('State %d' % i, 'Australia') for i in range(8)]
+    regions += [(np.nan, 'Country %03d' % i) for i in range(n_regions - len(regions))]
+    return regions
+
+
+# US layout: states & 'County, State' rows
+def us_regions(n_counties=N_US):
+    return [('County %d, ST%02d' % (i, i % 50), 'US') for i in range(n_counties)] + \
+        [('State %02d' % i, 'US') for i in range(50)]
+
+
+@pytest.fixture(scope='session')
+def df_global():
+    return make_jhu_frame(global_regions())
+
+
+@pytest.fixture(scope='session')
+def df_us():
+    return make_jhu_frame(us_regions(), seed=1)
+
+
+@pytest.fixture(scope='session')
+def df_spf():
+    '''Country level SPF table over N_DATES dates'''
+    rng = np.random.RandomState(2)
+    cases = np.cumsum(rng.randint(0, 500, N_DATES))
+    return pd.DataFrame({'date': pd.date_range('2020-03-01', periods=N_DATES), 'granularite': 'pays',
+                         'maille_nom': 'France', 'cas_confirmes': cases, 'deces': cases // 20})
+
+
+# Peak memory of one call
+def peak_memory(func, *args, **kwargs):
+    '''Return the peak memory [kB] allocated by func(*args, **kwargs), traced with tracemalloc'''
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / 1024.
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def bench(benchmark):
+    '''Benchmark a call and record its peak memory: bench(func, *args, **kwargs)'''
+    def run(func, *args, **kwargs):
+        benchmark.extra_info['peak_memory_kb'] = peak_memory(func, *args, **kwargs)
+        return benchmark(func, *args, **kwargs)
+    return run
+
+
+@pytest.fixture
+def bench_slow(benchmark):
+    '''Same as bench with a few rounds only, for calls lasting seconds'''
+    def run(func, *args, **kwargs):
+        benchmark.extra_info['peak_memory_kb'] = peak_memory(func, *args, **kwargs)
+        return benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=3, iterations=1)
+    return run
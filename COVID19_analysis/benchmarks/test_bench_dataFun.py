@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from covid19_analysis import dataFun, metrics
+from covid19_analysis.store import JHUStore
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+pytest.importorskip('pytest_benchmark')
+
+
+# get_timeseries_from_JHU modes: single row country, mainland rule, sum of provinces, worldwide total
+@pytest.mark.parametrize('country, mainland', [('Country 000', True), ('France', True), ('China', True),
+                                               ('France', False), ('all', True)])
+def test_get_timeseries_global(bench, df_global, country, mainland):
+    bench(dataFun.get_timeseries_from_JHU, df_global, country, mainland=mainland, verbose=False)
+
+
+@pytest.mark.parametrize('mainland', [True, False])
+def test_get_timeseries_us(bench, df_us, mainland):
+    bench(dataFun.get_timeseries_from_JHU, df_us, 'US', mainland=mainland, verbose=False)
+
+
+@pytest.mark.parametrize('country', ['France', 'all'])
+def test_get_timeseries_store(bench, df_global, country):
+    bench(dataFun.get_timeseries_from_JHU, JHUStore(df_global), country, verbose=False)
+
+
+def test_store_build_us(bench_slow, df_us):
+    bench_slow(JHUStore, df_us)
+
+
+@pytest.mark.parametrize('just_mainland', [True, False])
+def test_select_country(bench, df_global, just_mainland, capsys):
+    bench(dataFun.select_country, df_global, 'France', just_mainland=just_mainland)
+
+
+def test_safe_div(bench):
+    rng = np.random.RandomState(0)
+    x, y = rng.randint(0, 100, 10**6), rng.randint(0, 3, 10**6)
+    bench(dataFun.safe_div, x, y)
+
+
+def test_recreate_df_global(bench_slow, df_global):
+    bench_slow(dataFun.recreate_df, df_global)
+
+
+def test_recreate_df_us(bench_slow, df_us):
+    bench_slow(dataFun.recreate_df, df_us)
+
+
+@pytest.mark.parametrize('long_format', [False, True])
+def test_reshape_jhu_us(bench, df_us, long_format):
+    bench(dataFun.reshape_jhu, df_us, long_format=long_format)
+
+
+# Daily diff & rolling window path of dataPlot.last_daily_cases
+@pytest.mark.parametrize('rolling_win', [True, False])
+def test_last_daily_path(bench, df_global, rolling_win):
+    ctry_list = ['Country %03d' % i for i in range(0, 200, 10)]
+    bench(metrics.last_daily_cases, df_global, ctry_list, rolling_win=rolling_win)
+
+
+def test_aggregate_all_countries_us(bench, df_us):
+    bench(dataFun.aggregate_all_countries, df_us)
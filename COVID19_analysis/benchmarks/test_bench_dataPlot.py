@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+import pytest
+
+from covid19_analysis import dataFun, dataPlot
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+pytest.importorskip('pytest_benchmark')
+go = pytest.importorskip('plotly.graph_objs')
+
+# Display routines are timed up to the figure building, fig.show() is disabled
+CTRY_LIST = ['France', 'China', 'Canada'] + ['Country %03d' % i for i in range(5)]
+
+
+@pytest.fixture(autouse=True)
+def no_show(monkeypatch):
+    monkeypatch.setattr(go.Figure, 'show', lambda self, *args, **kwargs: None)
+
+
+@pytest.fixture(scope='module')
+def series(df_global):
+    '''Cases, recoveries & fatalities of one country'''
+    ts_case = dataFun.get_timeseries_from_JHU(df_global, 'France', verbose=False)
+    return ts_case, ts_case // 2, ts_case // 20
+
+
+def test_last_daily_cases(bench, df_global):
+    bench(dataPlot.last_daily_cases, df_global, CTRY_LIST)
+
+
+def test_growth_rates(bench, series):
+    bench(dataPlot.growth_rates, series[0])
+
+
+def test_growing_ratio_countries(bench, df_global, capsys):
+    bench(dataPlot.growing_ratio_countries, df_global, CTRY_LIST)
+
+
+def test_growing_ratio_spf(bench, df_spf):
+    bench(dataPlot.growing_ratio_countries, df_spf, 'France', df_source='SPF')
+
+
+def test_doublingtime_chart(bench):
+    bench(dataPlot.doublingtime_chart)
+
+
+@pytest.mark.parametrize('plot_type', ['line', 'Bar'])
+def test_disp_countries_comp(bench, df_global, plot_type):
+    bench(dataPlot.disp_countries_comp, df_global, CTRY_LIST, plot_type=plot_type)
+
+
+def test_disp_country_rates_jhu(bench, series):
+    bench(dataPlot.disp_country_rates_jhu, *series, 'France')
+
+
+def test_disp_cum_jhu(bench, series):
+    bench(dataPlot.disp_cum_jhu, *series, 'France')
+
+
+def test_disp_daily_cases_jhu(bench, series):
+    df_data = pd.DataFrame({'cases': series[0], 'recov': series[1], 'death': series[2]})
+    bench(dataPlot.disp_daily_cases, df_data, 'France')
+
+
+def test_disp_daily_cases_spf(bench, df_spf):
+    bench(dataPlot.disp_daily_cases, df_spf, 'France', df_source='SPF')
+
+
+def test_disp_current_cases(bench, df_spf):
+    bench(dataPlot.disp_current_cases, df_spf, 'France', pop_factor=1000)
+
+
+def test_disp_cumulative(bench, df_spf):
+    bench(dataPlot.disp_cumulative, df_spf, 'France')
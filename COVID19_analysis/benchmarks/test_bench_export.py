@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from covid19_analysis import metrics, figures, export
+from covid19_analysis.store import JHUStore
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+pytest.importorskip('pytest_benchmark')
+pytest.importorskip('plotly')
+
+# Dashboard of 30 countries: cumulative & rates charts per country plus the comparison chart
+N_COUNTRIES = 30
+
+
+@pytest.fixture(scope='module')
+def dashboard(df_global):
+    store = JHUStore(df_global)
+    countries = list(store.countries[:N_COUNTRIES])
+    figs = {}
+    for c in countries:
+        ts_case = store.get_timeseries(c, verbose=False)
+        figs[c + ' cumulative'] = figures.cum_jhu(metrics.cum_jhu(ts_case, ts_case // 2, ts_case // 20), c)
+        figs[c + ' rates'] = figures.country_rates(metrics.country_rates(ts_case, ts_case // 2, ts_case // 20), c)
+    figs['comparison'] = figures.countries_comp(metrics.countries_comp(store, countries))
+    return figs
+
+
+# Reference: one plotly JSON document per figure
+def figures_to_json(figs):
+    return [fig.to_json() for fig in figs.values()]
+
+
+def test_figures_to_json(bench, benchmark, dashboard):
+    res = bench(figures_to_json, dashboard)
+    benchmark.extra_info['bytes'] = sum(len(text) for text in res)
+
+
+@pytest.mark.parametrize('float32', [True, False])
+def test_to_bundle(bench, benchmark, dashboard, float32):
+    res = bench(export.to_bundle, dashboard, float32=float32)
+    benchmark.extra_info['bytes'] = len(res)
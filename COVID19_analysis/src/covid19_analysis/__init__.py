@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
-from pkg_resources import get_distribution, DistributionNotFound
+try:
+    # importlib.metadata is much faster to import than pkg_resources (python >= 3.8)
+    from importlib.metadata import version as get_version, PackageNotFoundError
+except ImportError:
+    from pkg_resources import get_distribution, DistributionNotFound as PackageNotFoundError
+
+    def get_version(dist_name):
+        return get_distribution(dist_name).version
 
 try:
     # Change here if project is renamed and does not equal the package name
     dist_name = 'COVID19_analysis'
-    __version__ = get_distribution(dist_name).version
-except DistributionNotFound:
+    __version__ = get_version(dist_name)
+except PackageNotFoundError:
     __version__ = 'unknown'
 finally:
-    del get_distribution, DistributionNotFound
+    del get_version, PackageNotFoundError
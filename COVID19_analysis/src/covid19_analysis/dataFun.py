@@ -4,14 +4,18 @@ import pandas as pd
 import numpy as np
 import re
 import math
+from collections import namedtuple
 
 from covid19_analysis import __version__
+from covid19_analysis.store import JHUStore, USStore, jhu_dates
+from covid19_analysis.instrument import instrumented
 
 __author__ = "J SAYRITUPAC"
 __copyright__ = "J SAYRITUPAC"
 __license__ = "mit"
 
 # Calculate the population over time for a given double time magnitude
+@instrumented
 def doubling_time_fun(pop_init, num_days, grow_rate, t0=0):
     '''Doubling time calculation, generate an array with the double time value which follows: 
         P(t)=P0 * e^(t*ln(2)/T), with T=growing rate        
@@ -25,12 +29,14 @@ def doubling_time_fun(pop_init, num_days, grow_rate, t0=0):
     return new_pop
 
 # Define doubling time equation
+@instrumented
 def doubling_time_equation(pop_init, num_day, grow_rate):
     '''Define the equation for doubling time calculation: 
         P(t)=P0 * e^(t*ln(2)/T), with T=growing rate        
         pop_init:   <int> initial population
         num_days:   <int> number of days past t0
         grow_rate:  <int> growing ratio in days
+    Arrays are broadcast together, e.g. days (1 x n) and rates (m x 1) give all the curves (m x n) at once
         
         Reference
             [1] https://en.wikipedia.org/wiki/Exponential_growth
@@ -38,20 +44,93 @@ def doubling_time_equation(pop_init, num_day, grow_rate):
             [3] http://sites.science.oregonstate.edu/~landaur/INSTANCES/WebModules/2_DecayGrowth/BiologicalGrowth/Pdfs/StudentReadings.pdf
         '''
     # doubling eq. as P(t)=P0 * e^(t*ln(2)/T), with T=growing rate
-    if type(num_day) == int:
+    if type(num_day) == int and np.ndim(pop_init) == 0 and np.ndim(grow_rate) == 0:
         new_pop = np.ceil(pop_init * math.e ** (num_day * np.log(2) / grow_rate))
     else:
-        new_pop = np.ceil(pop_init * math.e ** (np.array(num_day) * np.log(2) / grow_rate))
+        new_pop = np.ceil(np.asarray(pop_init) * math.e ** (np.asarray(num_day) * np.log(2) / np.asarray(grow_rate)))
     return new_pop
 
+# Rolling doubling time estimation
+DoublingTime = namedtuple('DoublingTime', ['doubling', 'lower', 'upper', 'slope', 'stderr'])
+
+@instrumented
+def estimate_doubling_time(matrix, window=7, min_points=3, z=1.96, monotone=True, chunk_rows=1024):
+    '''Estimate the doubling time for every region and date with a rolling log-linear least squares fit:
+        log(P(t)) = a + b*t over the trailing window ending at each date, doubling time T = ln(2)/b
+        Fits are computed in closed form from cumulative sums (no optimizer call), rows by chunks.
+        matrix:     <array> cumulative cases (regions x dates)
+        window:     <int> number of days of each fit
+        min_points: <int> minimum number of days with cases (>0) within the window, NaN otherwise
+        z:          <float> normal quantile of the confidence band, 1.96 for 95%
+        monotone:   <boolean> apply a running maximum so downward corrections are ignored
+        chunk_rows: <int> number of regions processed at once (bounds memory on county level files)
+    Returns a DoublingTime tuple of (regions x dates) arrays: doubling time [days] and its confidence band
+    (lower, upper), log-slope and its standard error. Doubling time is inf when the slope is not positive.
+        '''
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    n_rows, n_dates = matrix.shape
+    out = [np.full((n_rows, n_dates), np.nan) for _ in DoublingTime._fields]
+
+    t = np.arange(n_dates, dtype=float) - (n_dates - 1) / 2.   # centered time axis (numerical stability)
+    hi = np.arange(1, n_dates + 1)
+    lo = np.maximum(hi - window, 0)
+
+    for r0 in range(0, n_rows, chunk_rows):
+        data = matrix[r0:r0 + chunk_rows]
+        data = np.nan_to_num(data)
+        if monotone:
+            data = np.maximum.accumulate(data, axis=1)
+
+        # valid points are days with cases, log(0) is excluded from the fit
+        w = (data > 0).astype(float)
+        y = np.log(np.where(data > 0, data, 1.))
+
+        # window sums from cumulative sums: n, sum(t), sum(t^2), sum(y), sum(t*y), sum(y^2)
+        sums = []
+        for term in [w, w * t, w * t**2, w * y, w * t * y, w * y**2]:
+            csum = np.zeros((data.shape[0], n_dates + 1))
+            np.cumsum(term, axis=1, out=csum[:, 1:])
+            sums.append(csum[:, hi] - csum[:, lo])
+        n, st, stt, sy, sty, syy = sums
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sxx = stt - st**2 / n
+            sxy = sty - st * sy / n
+            syy_c = syy - sy**2 / n
+            slope = sxy / sxx
+            sse = np.maximum(syy_c - slope * sxy, 0)
+            stderr = np.sqrt(sse / (n - 2) / sxx)
+
+            valid = (n >= max(min_points, 2)) & (sxx > 0)
+            stderr[n < 3] = np.nan
+            slope[~valid] = np.nan
+            stderr[~valid] = np.nan
+
+            doubling = np.where(slope > 0, np.log(2) / slope, np.inf)
+            lower = np.where(slope + z * stderr > 0, np.log(2) / (slope + z * stderr), np.inf)
+            upper = np.where(slope - z * stderr > 0, np.log(2) / (slope - z * stderr), np.inf)
+        doubling[~valid] = lower[~valid] = upper[~valid] = np.nan
+
+        for arr, res in zip(out, [doubling, lower, upper, slope, stderr]):
+            arr[r0:r0 + chunk_rows] = res
+
+    return DoublingTime(*out)
+
 # Provide a timeseries for a define country from JHU dataset
+@instrumented
 def get_timeseries_from_JHU(df_jhu, country_name, mainland = True, verbose=True):
     '''Provide a timeseries for a define country from JHU dataset. 
-        df_jhu:         <dataframe> Dataset read from JHU repository
+        df_jhu:         <dataframe> Dataset read from JHU repository, or a JHUStore for indexed lookups,
+                        or a USStore (JHU US file) where country_name is 'US', a state, a county FIPS or Combined_Key
         country_name:   <string> Name of the country within the JHU country list
         mainland:       <boolean> Allows to choose between have only mainland data or all places data, True by default
         verbose:        <boolean> Display message for the user from data extraction
         '''
+    if isinstance(df_jhu, JHUStore):
+        return df_jhu.get_timeseries(country_name, mainland=mainland, verbose=verbose)
+    if isinstance(df_jhu, USStore):
+        return df_jhu.get_timeseries(country_name)
+
     if country_name is 'all':
         # Calculate the sum of all cases
         temp_array = df_jhu.sum(axis=0, numeric_only=True)
@@ -95,12 +174,28 @@ def get_timeseries_from_JHU(df_jhu, country_name, mainland = True, verbose=True)
                 df_out[c] = temp_array[c]
 
     # get timeseries
-    ts_country = pd.Series(data=df_out.iloc[0][4:].fillna(0).values, index=pd.to_datetime(df_out.columns[4:]), dtype=int)
+    ts_country = pd.Series(data=df_out.iloc[0][4:].fillna(0).values, index=jhu_dates(df_out.columns[4:]), dtype=int)
     return ts_country
 
+# Provide the timeseries of every country from JHU dataset in a single pass
+@instrumented
+def aggregate_all_countries(df_jhu, mainland = True):
+    '''Provide a dataframe with one row per country and one column per date, built on one vectorized pass.
+        Each row follows the same rules as get_timeseries_from_JHU (mainland, 'US' states only, empty Province/State)
+        df_jhu:     <dataframe> Dataset read from JHU repository, or a JHUStore
+        mainland:   <boolean> Allows to choose between have only mainland data or all places data, True by default
+        '''
+    if not isinstance(df_jhu, JHUStore):
+        df_jhu = JHUStore(df_jhu)
+    return df_jhu.to_frame(mainland=mainland)
+
 # Allow to select one country from the JHU dataset (merger all regions or just mainland)
+@instrumented
 def select_country(df_all, country_name, just_mainland = True):
     '''Provide a data-frame with the data from the selected country. Note: variable  'just_mainland' equal false,  will sum all Province/States'''
+    if isinstance(df_all, JHUStore):
+        df_all = df_all.frame
+
     if just_mainland:
         # check if exist more than one Province/Region
         if df_all['Province/State'].loc[df_all['Country/Region'] == country_name].size > 1:
@@ -120,6 +215,7 @@ def select_country(df_all, country_name, just_mainland = True):
         return df_out
 
 # Define a division for two vectors (array dim 1) when the divisor has zero
+@instrumented
 def safe_div(x,y):
     ''' Calculate a division between two vector on which the divisor have a zero value. The final result will have zero as well:
         z = x / y
@@ -131,22 +227,223 @@ def safe_div(x,y):
     res[isZero] = 0
     return res
 
+# Daily increments of cumulative timeseries (one row per region)
+@instrumented
+def daily_increments(data):
+    '''Calculate the daily variation of cumulative data, negative corrections are set to zero.
+        data:   <array> cumulative data, dates on the last axis (n dates). Output has n-1 dates, from the 2nd date
+        '''
+    data = np.asarray(data)
+    return np.diff(data, axis=-1).clip(0)
+
+# Rolling window sum computed from cumulative sums (all regions at once)
+@instrumented
+def rolling_sum(data, window=7, center=True):
+    '''Calculate a rolling sum over the last axis, equivalent to pandas rolling(window, min_periods=1, center).sum()
+        data:   <array> data with dates on the last axis
+        window: <int> window size in days, weekly by default
+        center: <boolean> set the window centered on the day, otherwise trailing window
+        '''
+    data = np.asarray(data)
+    n = data.shape[-1]
+    csum = np.zeros(data.shape[:-1] + (n + 1,), dtype=np.result_type(data.dtype, np.int64))
+    np.cumsum(data, axis=-1, out=csum[..., 1:])
+
+    # window bounds [t - left, t + right] clipped to the data limits
+    left, right = (window // 2, window - 1 - window // 2) if center else (window - 1, 0)
+    t = np.arange(n)
+    return csum[..., np.minimum(t + right + 1, n)] - csum[..., np.maximum(t - left, 0)]
+
+# Timeseries of a list of countries as a single (countries x dates) matrix
+@instrumented
+def get_countries_matrix(df_jhu, ctry_list, mainland = True, verbose=False):
+    '''Provide the timeseries of several countries from JHU dataset as one matrix, rows follow ctry_list.
+        The dataset is indexed once (JHUStore) so each country is a direct lookup.
+        df_jhu:     <dataframe> Dataset read from JHU repository, or a JHUStore
+        ctry_list:  <list> string list with countries (or 'all')
+        mainland:   <boolean> Allows to choose between have only mainland data or all places data, True by default
+        verbose:    <boolean> Display message for the user from data extraction
+    Returns the <array> matrix and the <DatetimeIndex> dates
+        '''
+    if not isinstance(df_jhu, JHUStore):
+        df_jhu = JHUStore(df_jhu)
+    data = np.array([df_jhu.get_timeseries(c, mainland=mainland, verbose=verbose).values for c in ctry_list], dtype=np.int64)
+    return data.reshape(len(ctry_list), df_jhu.dates.size), df_jhu.dates
+
+# Daily cases over the last days for all regions at once
+DailyCases = namedtuple('DailyCases', ['dates', 'daily', 'rolling'])
+
+@instrumented
+def last_daily_matrix(data, dates, num_days=3*31, rolling_win=True, window=7):
+    '''Calculate daily cases (clipped at zero) and rolling sums for a trailing period on a single pass.
+        data:       <array> cumulative data (regions x dates)
+        dates:      <DatetimeIndex> dates of the data columns
+        num_days:   <int> set the number of days to keep rolling back from the last day
+        rolling_win:<boolean> calculate the rolling sum with a window centered on the day
+        window:     <int> rolling window size in days, weekly by default
+    Returns a DailyCases tuple (dates, daily, rolling) restricted to the trailing period, rolling is None if not requested
+        '''
+    daily = daily_increments(data)
+    dates_d = dates[1:]
+    start = dates_d.searchsorted(dates_d[-1] - pd.Timedelta(num_days, unit='days')) if dates_d.size else 0
+
+    rolling = None
+    if rolling_win:
+        # the centered window needs some days before the period
+        s_from = max(start - window // 2, 0)
+        rolling = rolling_sum(daily[:, s_from:], window, center=True)[:, start - s_from:]
+    return DailyCases(dates_d[start:], daily[:, start:], rolling)
+
+# Regions aligned on the day they cross a threshold (epidemic days)
+AlignedDays = namedtuple('AlignedDays', ['start', 'length', 'data'])
+
+@instrumented
+def align_days(data, dates, threshold, baseline=None, clear_pop=False):
+    '''Align all regions on their first day above a threshold (day 0) with one argmax over the matrix.
+        data:       <array> cumulative data (regions x dates)
+        dates:      <DatetimeIndex> dates of the data columns
+        threshold:  <float> day 0 is the first day strictly above the threshold
+        baseline:   <date> re-baseline date, days before it are ignored, one date per region or a single date,
+                    all days by default
+        clear_pop:  <boolean> substract the counts of the baseline day (first day by default) before the threshold test
+    Returns an AlignedDays tuple: start (column of day 0, -1 if the threshold is never crossed), length (number of
+    days from day 0 to the last date) and data, a float (regions x days) array padded with NaN after the last date
+        '''
+    values = np.asarray(data, dtype=float)
+    n_regions, n_dates = values.shape
+    rows = np.arange(n_regions)
+
+    base = np.zeros(n_regions, dtype=int)
+    if baseline is not None:
+        base[:] = dates.searchsorted(pd.to_datetime(baseline))
+    if clear_pop:
+        values = values - values[rows, np.minimum(base, n_dates - 1)][:, np.newaxis]
+
+    # first crossing of every region at once
+    above = (values > threshold) & (np.arange(n_dates) >= base[:, np.newaxis])
+    start = above.argmax(axis=1)
+    crossed = above[rows, start]
+    start[~crossed] = -1
+    length = np.where(crossed, n_dates - start, 0)
+
+    # ragged rows gathered into a padded matrix
+    days = np.arange(length.max() if n_regions else 0)
+    aligned = values[rows[:, np.newaxis], np.minimum(start[:, np.newaxis] + days, n_dates - 1)]
+    aligned[days >= length[:, np.newaxis]] = np.nan
+    return AlignedDays(start, length, aligned)
+
+# Largest-Triangle-Three-Buckets point selection, all rows at once
+def _lttb_index(data, max_points):
+    n_rows, n = data.shape
+    rows = np.arange(n_rows)
+    x = np.arange(n, dtype=float)
+    # first & last points kept, max_points-2 buckets in between
+    edges = (np.arange(max_points - 1) * ((n - 2) / (max_points - 2))).astype(int) + 1
+    edges[-1] = n - 1
+
+    index = np.empty((n_rows, max_points), dtype=int)
+    index[:, 0], index[:, -1] = 0, n - 1
+    a = np.zeros(n_rows, dtype=int)
+    for b in range(max_points - 2):
+        b0, b1 = edges[b], edges[b + 1]
+        c1 = edges[b + 2] if b + 2 < edges.size else n
+        # average point of the next bucket
+        cx, cy = x[b1:c1].mean(), data[:, b1:c1].mean(axis=1)
+        ax, ay = x[a], data[rows, a]
+        # twice the triangles areas (selected point, bucket candidates, next bucket average)
+        area = np.abs((ax - cx)[:, np.newaxis] * (data[:, b0:b1] - ay[:, np.newaxis])
+                      - (ax[:, np.newaxis] - x[b0:b1]) * (cy - ay)[:, np.newaxis])
+        a = b0 + area.argmax(axis=1)
+        index[:, b + 1] = a
+    return index
+
+
+# Min & max point of each bucket, all rows & buckets at once
+def _minmax_index(data, max_points):
+    n_rows, n = data.shape
+    edges = np.linspace(0, n, max_points // 2 + 1).astype(int)
+    cols = edges[:-1, np.newaxis] + np.arange(np.diff(edges).max())
+    outside = cols >= edges[1:, np.newaxis]
+    buckets = data[:, np.minimum(cols, n - 1)]     # (rows x buckets x bucket size)
+
+    low = np.where(outside, np.inf, buckets).argmin(axis=2)
+    high = np.where(outside, -np.inf, buckets).argmax(axis=2)
+    index = np.sort(np.stack([low, high], axis=2), axis=2) + edges[:-1, np.newaxis]
+    return index.reshape(n_rows, -1)
+
+
+# Decimate time series to a number of points per series
+@instrumented
+def decimate(data, max_points, method='lttb'):
+    '''Select the points to draw of each row so a chart keeps its shape with at most max_points per trace.
+        data:       <array> data (rows x dates), dates evenly spaced (daily series)
+        max_points: <int> points budget per row (at least 3 for 'lttb', 2 for 'minmax')
+        method:     <string> 'lttb' (Largest-Triangle-Three-Buckets, first & last points kept) or 'minmax'
+                    (lowest & highest points of max_points/2 buckets, keeps the peaks)
+    Returns the (rows x points) column indices, increasing on each row, all columns if the rows are short enough
+        '''
+    min_points = {'lttb': 3, 'minmax': 2}
+    if method not in min_points:
+        raise ValueError('Not valid value for method: %s' % (method))
+    if max_points < min_points[method]:
+        raise ValueError('max_points must be at least %d for %s, got %s' % (min_points[method], method, max_points))
+
+    data = np.asarray(data, dtype=float)
+    n_rows, n = data.shape
+    if n <= max_points:
+        return np.broadcast_to(np.arange(n), (n_rows, n))
+
+    if method == 'lttb':
+        return _lttb_index(data, max_points)
+    return _minmax_index(data, max_points)
+
+# 'Country - Province' header of each region, country only for regions without province
+def _region_headers(country, province):
+    country = pd.Series(country, dtype='str').values
+    has_prov = pd.notna(province)
+    headers = country.astype(object)
+    headers[has_prov] = [c + ' - ' + str(p) for c, p in zip(country[has_prov], province[has_prov])]
+    return headers
+
+
+# Reshape the JHU dataset as dates x regions (or long format) without copying the counts
+@instrumented
+def reshape_jhu(df_jhu, copy=False, long_format=False):
+    '''Provide the JHU counts as a dataframe with dates as rows (index 'Date') and regions as columns labeled
+    'Country - Province' ('Country' for regions without province), from one transpose of the numeric block.
+        df_jhu:         <dataframe> Dataset read from JHU repository, or a JHUStore (regions in the store order)
+        copy:           <boolean> return an independent copy, a view on the dataset counts by default
+        long_format:    <boolean> return a long table instead: Date, Region (categorical) & value, one row per
+                        region and date (always a copy)
+    Note: the counts are shared without copy for a JHUStore, and for a dataframe whose date columns are
+    stored as a single block (a copy of the block is made otherwise)
+        '''
+    if isinstance(df_jhu, JHUStore):
+        country, province = df_jhu.countries.values[df_jhu.codes], df_jhu.provinces
+        values, dates = df_jhu.values, df_jhu.dates
+    else:
+        country, province = df_jhu['Country/Region'].values, df_jhu['Province/State'].values
+        values, dates = df_jhu.iloc[:, 4:].to_numpy(), jhu_dates(df_jhu.columns[4:])
+    headers = _region_headers(country, province)
+
+    if long_format:
+        n_regions, n_dates = values.shape
+        codes, regions = pd.factorize(headers)
+        return pd.DataFrame({
+            'Date': np.tile(dates.values, n_regions),
+            'Region': pd.Categorical.from_codes(np.repeat(codes, n_dates), regions),
+            'value': values.ravel(),
+        })
+
+    return pd.DataFrame(values.T, index=pd.DatetimeIndex(dates, name='Date'), columns=headers, copy=copy)
+
+
 # Ancient function. Define a new dataframe from JHU dataframe by reshaping columns by rows and excluding some variables (lat & long)
+@instrumented
 def recreate_df(raw_df):
-    '''OLD FUNCTION: Create a dataframe based on the DF provide by the JHU repository'''
-    # identify columns and datetime data
-    col_names = raw_df.columns
-    date_data = pd.to_datetime(raw_df.columns[4:])
-    
-    # build columns header as country - province (if not empty)
-    region_col = pd.Series(data=raw_df['Province/State'], dtype='str')
-    country_col = pd.Series(data=raw_df['Country/Region'], dtype='str')
-    col_headers = country_col.str.cat(region_col, sep=(' - '))
-    col_headers = col_headers.str.rstrip(' nan').str.rstrip(' -')
-    
-    # Build dataframe without coordinates and with time as row + countries as columns
-    new_df = pd.DataFrame(data=date_data, columns=['Date'])
-    for cidx, c in enumerate(col_headers):
-        data_tmp = np.array(raw_df.iloc[cidx][4:], dtype=int)
-        new_df[c] = data_tmp
+    '''OLD FUNCTION: Create a dataframe based on the DF provide by the JHU repository, see reshape_jhu'''
+    # Build dataframe without coordinates and with time as row + countries as columns (empty cells as zero)
+    df_view = reshape_jhu(raw_df)
+    new_df = pd.DataFrame(np.nan_to_num(df_view.values).astype(int, copy=False), columns=df_view.columns)
+    new_df.insert(0, 'Date', df_view.index)
     return new_df
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Compact export of the figures for a web front end: several figures (e.g. the charts of
+a multi-country dashboard) written as one JSON bundle with binary typed arrays.
+
+    import covid19_analysis.export as export
+    export.to_bundle({'France': fig_fr, 'Italy': fig_it}, 'dashboard.json')
+    figs = export.read_bundle('dashboard.json')
+
+Numeric arrays are base64 plotly.js typed arrays ({'dtype', 'bdata'}): integers with the
+smallest type up to int32, floats as float32. Date arrays are stored once in the bundle
+'axes' (int32 days since 1970-01-01 for daily dates) and traces refer to them with
+{'$ref': 'axes/<id>'}, plus an 'index' typed array when the trace uses a subset of the
+axis (decimated traces). Layout templates are shared the same way ('templates/<id>').
+"""
+
+import json
+import base64
+
+import numpy as np
+
+from covid19_analysis import __version__
+from covid19_analysis.instrument import instrumented
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+BUNDLE_FORMAT = 'covid19-bundle'
+BUNDLE_VERSION = 1
+
+_INT_TYPES = [(np.int8, 'i1'), (np.int16, 'i2'), (np.int32, 'i4')]
+_JS_TYPES = {'i1': np.int8, 'u1': np.uint8, 'i2': np.int16, 'u2': np.uint16, 'i4': np.int32, 'u4': np.uint32,
+             'f4': np.float32, 'f8': np.float64}
+
+
+# Numeric array as a plotly.js typed array
+def _typed(values, float32=True):
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu' and values.size:
+        low, high = values.min(), values.max()
+        for np_type, js_type in _INT_TYPES:
+            if np.iinfo(np_type).min <= low and high <= np.iinfo(np_type).max:
+                break
+        else:
+            np_type, js_type = np.float64, 'f8'
+    elif float32:
+        np_type, js_type = np.float32, 'f4'
+    else:
+        np_type, js_type = np.float64, 'f8'
+
+    spec = {'dtype': js_type, 'bdata': base64.b64encode(np.ascontiguousarray(values, dtype=np_type)).decode('ascii')}
+    if values.ndim > 1:
+        spec['shape'] = ', '.join(str(n) for n in values.shape)
+    return spec
+
+
+# plotly.js typed array back to numpy
+def _untyped(spec):
+    values = np.frombuffer(base64.b64decode(spec['bdata']), dtype=_JS_TYPES[spec['dtype']])
+    if 'shape' in spec:
+        values = values.reshape([int(n) for n in spec['shape'].split(',')])
+    return values
+
+
+# Date array as int32 days (daily dates) or float64 seconds since 1970-01-01
+def _encode_dates(dates):
+    days = dates.astype('datetime64[D]')
+    if (days == dates).all():
+        return dict(_typed(days.astype(np.int64).astype(np.int32)), unit='D')
+    return dict(_typed(dates.astype('datetime64[ms]').astype(np.int64) / 1e3, float32=False), unit='s')
+
+
+def _decode_dates(spec):
+    values = _untyped(spec)
+    if spec['unit'] == 'D':
+        return values.astype('datetime64[D]')
+    return (values * 1e3).astype('datetime64[ms]')
+
+
+# Date axes & templates shared by the figures of a bundle
+class _Shared(object):
+
+    def __init__(self, float32=True):
+        self.float32 = float32
+        self.axes = {}          # id -> encoded dates
+        self._axes = []         # (id, dates) in creation order
+        self.templates = {}
+        self._templates = {}    # template json text (or default template name) -> id
+
+    # reference to a date axis, the first array containing all the dates is used
+    def axis_ref(self, dates):
+        dates = np.asarray(dates).astype('datetime64[us]')
+        for axis_id, axis in self._axes:
+            if axis.size == dates.size and (axis == dates).all():
+                return {'$ref': 'axes/' + axis_id}
+            pos = axis.searchsorted(dates)
+            if dates.size < axis.size and (pos < axis.size).all() and (axis[np.minimum(pos, axis.size - 1)] == dates).all():
+                return {'$ref': 'axes/' + axis_id, 'index': _typed(pos)}
+
+        axis_id = 'a%d' % (len(self._axes))
+        self._axes.append((axis_id, dates))
+        self.axes[axis_id] = _encode_dates(dates)
+        return {'$ref': 'axes/' + axis_id}
+
+    # reference to a layout template, plotly default template when the layout has none
+    def template_ref(self, template=None):
+        if template is None:
+            import plotly.io as pio
+            if pio.templates.default in (None, 'none'):
+                return None
+            key = 'default:' + pio.templates.default
+            if key not in self._templates:
+                template = pio.templates[pio.templates.default].to_plotly_json()
+        else:
+            key = json.dumps(template, sort_keys=True, default=_json_default)
+        if key not in self._templates:
+            self._templates[key] = 't%d' % (len(self._templates))
+            self.templates[self._templates[key]] = json.loads(json.dumps(template, default=_json_default))
+        return {'$ref': 'templates/' + self._templates[key]}
+
+    # encode the arrays of a (nested) figure property
+    def encode(self, value):
+        if isinstance(value, dict):
+            if 'bdata' in value and 'dtype' in value:     # already typed by plotly
+                return _typed(_untyped(value), self.float32)
+            return {k: self.encode(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)) and value and all(isinstance(v, (int, float)) and not isinstance(v, bool)
+                                                               for v in value):
+            value = np.asarray(value)
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind == 'M':
+                return self.axis_ref(value)
+            if value.dtype.kind in 'iuf' and value.size:
+                return _typed(value, self.float32)
+            return value.tolist()
+        if isinstance(value, (list, tuple)):
+            return [self.encode(v) for v in value]
+        return value
+
+
+# numpy scalars & arrays left in the plotly dicts
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError('%s is not JSON serializable' % (type(obj).__name__))
+
+
+# Encode figures into a single bundle
+@instrumented
+def to_bundle(figs, path=None, float32=True):
+    '''Serialize figures into one compact JSON bundle, see the module documentation for the layout
+        figs:       <dict> {name: plotly figure}, e.g. the charts of several countries
+        path:       <string> output file, the bundle is only returned if None
+        float32:    <boolean> store the floats as float32 (float64 otherwise)
+    Returns the bundle as a JSON string
+        '''
+    shared = _Shared(float32)
+    payloads = {}
+    for name, fig in figs.items():
+        # traces & layout properties as set by the builders (fig.to_dict copies & converts the whole template)
+        layout = fig.layout.to_plotly_json()
+        template = shared.template_ref(layout.pop('template', None))
+        layout = shared.encode(layout)
+        if template is not None:
+            layout['template'] = template
+        payloads[name] = {'data': [shared.encode(trace.to_plotly_json()) for trace in fig.data], 'layout': layout}
+
+    text = json.dumps({'format': BUNDLE_FORMAT, 'version': BUNDLE_VERSION, 'axes': shared.axes,
+                       'templates': shared.templates, 'figures': payloads},
+                      separators=(',', ':'), default=_json_default)
+    if path is not None:
+        with open(path, 'w') as f:
+            f.write(text)
+    return text
+
+
+# Resolve the references & typed arrays of a bundle property
+def _decode(value, bundle):
+    if isinstance(value, dict):
+        if '$ref' in value:
+            group, ref_id = value['$ref'].split('/')
+            if group == 'templates':
+                return bundle['templates'][ref_id]
+            dates = _decode_dates(bundle['axes'][ref_id])
+            return dates[_untyped(value['index'])] if 'index' in value else dates
+        if 'bdata' in value and 'dtype' in value:
+            return _untyped(value)
+        return {k: _decode(v, bundle) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v, bundle) for v in value]
+    return value
+
+
+# Read a bundle back into figures
+def read_bundle(source):
+    '''Rebuild the figures of a bundle written by to_bundle
+        source:     <string> bundle file path, or the bundle JSON string
+    Returns {name: plotly figure}
+        '''
+    import plotly.graph_objs as go
+    if source.lstrip().startswith('{'):
+        bundle = json.loads(source)
+    else:
+        with open(source) as f:
+            bundle = json.load(f)
+    if bundle.get('format') != BUNDLE_FORMAT:
+        raise ValueError('Not a %s file' % (BUNDLE_FORMAT))
+
+    return {name: go.Figure(_decode(payload, bundle)) for name, payload in bundle['figures'].items()}
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import functools
+import math
+
+import numpy as np
+
+# import local functions
+import covid19_analysis.metrics as metrics
+from covid19_analysis.instrument import instrumented
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+# Note: plotly is heavy to import (hundreds of ms), it is imported by each builder so
+# the package can be used without loading it until the first figure is built
+
+
+# Date appended to the charts title
+def _today():
+    return datetime.datetime.today().strftime(', %B %d, %Y')
+
+
+# x values of one trace: dates shared by all traces, or one row per trace for decimated results
+def _trace_x(dates, idx):
+    return dates[idx] if np.ndim(dates) == 2 else dates
+
+
+# Last days daily cases trend per country
+@instrumented
+def last_daily_cases(res, df_type='cases'):
+    '''Build the daily cases chart from metrics.last_daily_cases
+        res:        <LastDaily> countries daily cases
+        df_type:    <string> define the type of data displayed, optiones are 'cases', 'recover' & 'fatalities'
+    '''
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    for c_idx, c in enumerate(res.names):
+        fig.add_trace(
+            go.Scatter(
+                mode = 'lines',
+                name = c,
+                x = _trace_x(res.dates, c_idx),
+                y = res.daily[c_idx],
+                line=dict(width = 1.5),
+            )
+        )
+
+    fig.update_layout(
+        plot_bgcolor='white',
+        xaxis_title = 'Dates [Days]',
+        yaxis_title = 'Daily ' + df_type,
+        title = 'Lasts month '+ df_type + ' evolution' + _today(),
+        title_x = .5
+    )
+
+    fig.update_yaxes(showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+    return fig
+
+
+# Growth rates over time
+@instrumented
+def growth_rates(res, label='Cases'):
+    '''Build the growth ratio chart from metrics.growth_rates'''
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            mode = 'lines+markers',
+            x = res.dates,
+            y = res.ratio,
+            marker = dict(color = 'Black', line = dict(color = 'DarkGrey', width=1.5)),
+        ))
+
+    fig.update_layout(
+        plot_bgcolor='white',
+        xaxis_title = 'Time [Days]',
+        yaxis_title = 'Infection growth ratio',
+        title = label + 'growth ratio' + _today(),
+        title_x = .5
+        )
+    fig.update_yaxes(showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+    return fig
+
+
+# Doubling time chart template
+@instrumented
+def doublingtime_chart(refs, pop_th=100, num_days=37):
+    '''Build a doubling time chart template from metrics.doubling_references
+        refs:       <DoublingReferences> reference curves & annotations
+        pop_th:     <int> population threshold, set the chart starting point
+        num_days:   <int> set the number of days to display
+
+    Graph inspired on Lisa Charlotte ROST work https://www.datawrapper.de/_/w6x6z/
+    '''
+    # build a chart template (growing ratios references)
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    for gr_idx, ncase in enumerate(refs.curves):
+        fig.add_trace(
+            go.Scatter(
+                mode = 'lines',
+                name = refs.labels[gr_idx],
+                x = refs.days,
+                y = ncase,
+                marker_symbol = 100+2*gr_idx, #select 'open' symbols
+                line=dict(color='DarkGray', width = 1.5, dash = 'dashdot'),
+                showlegend=False,
+                hoverinfo='skip'
+        ))
+
+    # anotation style
+    annotation_style=dict(size=10, color='DimGray')
+    for day, log_cases, text in refs.annotations:
+        fig.add_annotation(x = day, y = log_cases, text = text, font = annotation_style, arrowcolor='DimGray')
+
+    # set chart style and names
+    fig.update_yaxes(range=[math.log10(pop_th), math.log10(pop_th)+3.5])
+    fig.update_xaxes(range=[0, num_days])
+    fig.update_layout(
+        yaxis_type="log",
+        plot_bgcolor='white',
+        xaxis_title = 'Days',
+        yaxis_title = 'Number of cases <br> <sub>Log axe</sub>',
+    )
+    fig.update_yaxes(showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+    return fig
+
+
+# Doubling time chart template built once per arguments
+@functools.lru_cache(maxsize=32)
+def _doubling_template(pop_th, num_days, rates):
+    fig_dict = doublingtime_chart(metrics.doubling_references(pop_th, num_days, rates), pop_th, num_days).to_dict()
+    # the default plotly template is most of the validation time, it is set back by go.Figure
+    fig_dict['layout'].pop('template', None)
+    return fig_dict
+
+
+# Copy of the cached doubling time chart template
+def doubling_template(pop_th=100, num_days=37, rates=None):
+    '''Return a new doubling time chart template (see doublingtime_chart), the template is built once
+    for each (pop_th, num_days, rates) and copied (several times faster than building it), the copy can be modified freely
+        rates:      <list> doubling rates [days], metrics.DOUBLING_RATES by default
+    '''
+    import plotly.graph_objs as go
+    rates = metrics.DOUBLING_RATES if rates is None else rates
+    return go.Figure(_doubling_template(pop_th, num_days, tuple(rates)))
+
+
+# Countries cases over time compare to standards doubling-time ratios
+@instrumented
+def growing_ratio_countries(traces, pop_th=100, num_days=37, df_source='JHU'):
+    '''Build the doubling time chart with the traces from metrics.growing_ratio_countries'''
+    import plotly.graph_objs as go
+    fig_gr = doubling_template(pop_th, num_days)
+
+    if df_source == 'JHU':
+        for tr in traces:
+            fig_gr.add_trace(
+                go.Scatter(mode = 'lines', x = tr.x, y = tr.y, name = tr.name))
+        fig_gr.update_layout(title = 'Doubling rates per country' + _today(), title_x = .5)
+
+    elif df_source == 'raw_data':
+        for tr in traces:
+            fig_gr.add_trace(
+                go.Scatter(mode = 'lines', x = tr.x, y = tr.y, name = tr.name, line = dict(color = 'Black')))
+
+    elif df_source == 'SPF':
+        colors = {'Cases': 'CornflowerBlue', 'Fatalities': 'Black'}
+        for tr in traces:
+            fig_gr.add_trace(
+                go.Scatter(mode = 'lines+markers', x = tr.x, y = tr.y, name = tr.name,
+                                          line=dict(color=colors[tr.name])))
+        fig_gr.update_layout(title = 'Doubling rates in France' + _today(), title_x = .5)
+
+    return fig_gr
+
+
+# Countries comparison
+@instrumented
+def countries_comp(res, plot_type='line'):
+    '''Build the countries comparison chart from metrics.countries_comp'''
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    for c_idx, country in enumerate(res.names):
+        if plot_type == 'Bar':
+            fig.add_trace(
+                go.Bar(x = _trace_x(res.dates, c_idx), y = res.data[c_idx], name = country))
+
+        elif plot_type == 'line':
+            fig.add_trace(
+                go.Scatter(mode = 'lines+markers', x = _trace_x(res.dates, c_idx), y = res.data[c_idx], name = country))
+
+    # set background and axis chart style
+    fig.update_layout(
+        xaxis_title = 'Time [Days]',
+        yaxis_title = 'Cases',
+        title = 'COVID-19 cases per country' + _today(),
+        title_x = 0.5,
+        plot_bgcolor='white',
+        yaxis_type="log"
+    )
+
+    # display horizontal grid lines
+    fig.update_yaxes(showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+    return fig
+
+
+# Recoveries and fatalities rates
+@instrumented
+def country_rates(res, loc_name):
+    '''Build the recovery & fatalities rates chart from metrics.country_rates'''
+    from plotly.subplots import make_subplots
+    fig = make_subplots(rows=2, cols=1)
+
+    fig.add_bar(
+        row=1, col=1,
+        x = res.dates,
+        y = res.recovery,
+        name = 'Recoveries',
+        marker = dict(color = 'darkseagreen', line=dict(color='forestgreen', width=1.5)),
+    )
+    fig.update_xaxes(title_text="Time [Days]", row=1, col=1)
+    fig.update_yaxes(title_text="Percentage [%]", row=1, col=1, showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+
+    fig.add_bar(
+        row=2, col=1,
+        x = res.dates,
+        y = res.fatality,
+        name = 'Fatalities',
+        marker = dict(color = 'DimGray', line=dict(color='Black', width=1.5)),
+    )
+    fig.update_xaxes(title_text="Time [Days]", row=2, col=1)
+    fig.update_yaxes(title_text="Percentage [%]", row=2, col=1, showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+
+    fig.update_layout(
+        title_text = 'Recovery & Fatalities rates for ' + loc_name + _today(),
+        title_x = .5,
+        plot_bgcolor='white')
+    return fig
+
+
+# Cumulative cases for JHU source
+@instrumented
+def cum_jhu(res, loc_name):
+    '''Build the cumulative cases chart from metrics.cum_jhu'''
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    # diagnosed cases
+    fig.add_trace(
+        go.Scatter(mode='lines+markers', x=_trace_x(res.dates, 0), y=res.cases, name = 'All cases',
+                                  marker=dict(color='CornflowerBlue')))
+    # recover cases
+    fig.add_trace(
+        go.Scatter(mode='lines+markers', x=_trace_x(res.dates, 1), y=res.recov, name = 'Recover',
+                                  marker=dict(color='forestgreen')))
+    # death cases
+    fig.add_trace(
+        go.Scatter(mode='lines+markers', x=_trace_x(res.dates, 2), y=res.death, name = 'Fatalities',
+                                  marker=dict(color='black')))
+
+    if res.cases.size and res.cases.max() > 100:
+        fig.update_layout(yaxis_title = 'Cases [Log]', yaxis_type="log")
+    else:
+        fig.update_layout(yaxis_title = 'Cases')
+
+    fig.update_layout(
+        xaxis_title = 'Time [Days]',
+        plot_bgcolor='white',
+        title = 'Current situation in ' + loc_name + _today(),
+        title_x = .5
+    )
+
+    fig.update_yaxes(showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+    return fig
+
+
+# Daily cases bars
+@instrumented
+def daily_cases(res, loc_name):
+    '''Build the daily progression chart from metrics.daily_cases'''
+    import plotly.graph_objs as go
+    fig = go.Figure()
+
+    # daily cases
+    fig.add_trace(
+        go.Bar(
+            x = res.dates,
+            y = res.cases,
+            marker = dict(color = 'CornflowerBlue', line = dict(color = 'DarkBlue', width=1.5)),
+            name = 'Cases'
+    ))
+
+    # daily fatalities
+    fig.add_trace(
+        go.Bar(
+            x = res.dates,
+            y = res.death,
+            marker = dict(color = 'DimGray', line = dict(color = 'Black', width=1.5)),
+            name = 'Fatalities'
+    ))
+
+    if res.recov is not None: # exclude SPF
+        # daily recoveries
+        fig.add_trace(
+            go.Bar(
+                x = res.dates,
+                y = res.recov,
+                marker = dict(color = 'DarkSeaGreen', line = dict(color = 'ForestGreen', width=1.5)),
+                name = 'Recoveries'
+        ))
+
+    fig.update_layout(
+        plot_bgcolor='white',
+        xaxis_title = 'Time [Days]',
+        yaxis_title = 'Cases',
+        title = 'Daily progression in ' + loc_name + _today(),
+        title_x = .5
+    )
+    fig.update_yaxes(showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+    return fig
+
+
+# On going cases bars
+@instrumented
+def current_cases(res, loc_name, pop_factor=1):
+    '''Build the current active cases chart from metrics.current_cases'''
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    # Confirmed cases
+    fig.add_trace(
+        go.Bar(x=res.dates, y=res.ongoing, name = 'On going cases', marker=dict(color='CornflowerBlue')))
+    # Fatalities
+    fig.add_trace(
+        go.Bar(x=res.dates, y=res.death, name = 'Fatalities', marker=dict(color='Black')))
+
+    fig.update_yaxes(showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+
+    if pop_factor == 1:
+        fig.update_yaxes(title = 'Number of confirmed cases')
+    else:
+        fig.update_yaxes(title = 'Number of confirmed cases <br>  <sub>factor of 1 by ' + str(format(pop_factor, ",").replace(",", ".")) +' peoples</sub>')
+
+    fig.update_layout(
+        barmode = 'stack',
+        xaxis_title = 'Time [Days]',
+        plot_bgcolor='white',
+        title = 'Current active cases in ' + loc_name + _today(),
+        title_x = .5
+    )
+    return fig
+
+
+# Cumulative cases for SPF source
+@instrumented
+def cumulative(res, loc_name):
+    '''Build the cumulative cases chart (log axis) from metrics.cumulative'''
+    import plotly.graph_objs as go
+    fig = go.Figure()
+    # add scatter chart for confirmed cases
+    fig.add_trace(
+        go.Scatter(mode = 'lines+markers', x=res.dates, y=res.cases, name = 'Confirmed cases',
+                                  marker=dict(color='CornflowerBlue')))
+    # add scatter chart for fatalities
+    fig.add_trace(
+        go.Scatter(mode='lines+markers', x=res.dates, y=res.death, name = 'Fatalities',
+                                  marker=dict(color='black')))
+
+    fig.update_layout(yaxis_title = 'Cases [Log]', yaxis_type="log")
+
+    fig.update_layout(
+        xaxis_title = 'Time [Days]',
+        plot_bgcolor='white',
+        title = 'Current status in ' + loc_name + ' , ' + datetime.datetime.today().strftime('%B %d, %Y'),
+        title_x = .5
+    )
+    fig.update_yaxes(showgrid=True, gridwidth=.3, gridcolor='gainsboro')
+    return fig
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+# import local functions
+import covid19_analysis.dataFun as dataFun
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Replace the columns of a matrix starting from col_from
+def _patch(data, block, col_from):
+    if data is None or col_from == 0:
+        return block
+    return np.concatenate([data[:, :col_from], block], axis=1)
+
+
+# Derived products of JHU stores, updated from the first modified date only
+class DerivedProducts(object):
+    '''Per country products derived from JHU stores and kept up to date on daily refresh:
+        daily:          <array> daily cases (clipped at zero) as in dataPlot.last_daily_cases, dates[1:]
+        rolling:        <array> rolling window sum of the daily cases, dates[1:]
+        growth:         <array> growth ratio between consecutive days (dataFun.safe_div), dates[1:]
+        recovery_rate:  <array> recoveries over cases [%], only if recovered store is given
+        fatality_rate:  <array> fatalities over cases [%], only if deaths store is given
+    Rows follow cases.countries, matrices hold one column per date.
+        cases:      <JHUStore> confirmed cases
+        recovered:  <JHUStore> recovered cases, optional
+        deaths:     <JHUStore> fatalities, optional
+        window:     <int> rolling window size in days, centered on the day
+        mainland:   <boolean> use mainland data (True) or the sum of all Province/State (False)
+    '''
+
+    def __init__(self, cases, recovered=None, deaths=None, window=7, mainland=True):
+        self.cases, self.recovered, self.deaths = cases, recovered, deaths
+        self.window = window
+        self.mainland = mainland
+        self.daily = self.rolling = self.growth = None
+        self.recovery_rate = self.fatality_rate = None
+        self.update(0)
+
+    @property
+    def countries(self):
+        return self.cases.countries
+
+    @property
+    def dates(self):
+        return self.cases.dates
+
+    # Country aligned data for one store from a date column
+    def _metric(self, store, col_from, col_to=None):
+        '''Return the (cases.countries x dates[col_from:col_to]) block of a store, zero for missing countries'''
+        data = store.mainland if self.mainland else store.provinces_sum
+        data = data[:, col_from:col_to]
+        if store is self.cases:
+            return data
+        ridx = store.countries.get_indexer(self.cases.countries)
+        block = data[ridx]
+        block[ridx < 0] = 0
+        return block
+
+    # Rate of a store faces to total cases
+    def _rate(self, store, col_from):
+        n_dates = min(self.cases.dates.size, store.dates.size)
+        return dataFun.safe_div(self._metric(store, col_from, n_dates), self._metric(self.cases, col_from, n_dates)) * 100
+
+    # Recompute derived products from a date column
+    def update(self, col_from=0):
+        '''Update all derived products for dates >= col_from, previous dates are kept as is
+            col_from:   <int> first modified date column (as returned by JHUStore.refresh)
+            '''
+        left, right = self.window // 2, self.window - 1 - self.window // 2
+
+        # daily variations & growth ratio (column j uses dates j and j+1)
+        d_from = max(col_from - 1, 0)
+        data = self._metric(self.cases, d_from)
+        self.daily = _patch(self.daily, dataFun.daily_increments(data), d_from)
+        self.growth = _patch(self.growth, dataFun.safe_div(data[:, 1:], data[:, :-1]), d_from)
+
+        # rolling sum, windows overlapping a modified day are recomputed
+        r_from = max(d_from - right, 0)
+        s_from = max(r_from - left, 0)
+        rolling = dataFun.rolling_sum(self.daily[:, s_from:], self.window, center=True)
+        self.rolling = _patch(self.rolling, rolling[:, r_from - s_from:], r_from)
+
+        # recovery & fatality rates
+        if self.recovered is not None:
+            self.recovery_rate = _patch(self.recovery_rate, self._rate(self.recovered, col_from), col_from)
+        if self.deaths is not None:
+            self.fatality_rate = _patch(self.fatality_rate, self._rate(self.deaths, col_from), col_from)
+
+    # Daily refresh from newer JHU dataframes
+    def refresh(self, df_cases, df_recovered=None, df_deaths=None):
+        '''Refresh the stores with newer JHU dataframes and update the derived products incrementally
+            df_cases:       <dataframe> newer confirmed cases dataset
+            df_recovered:   <dataframe> newer recovered dataset, optional
+            df_deaths:      <dataframe> newer fatalities dataset, optional
+        Returns the first modified date column
+        '''
+        countries = self.cases.countries
+        col_from = self.cases.refresh(df_cases)
+        for store, df_new in [(self.recovered, df_recovered), (self.deaths, df_deaths)]:
+            if store is not None and df_new is not None:
+                col_from = min(col_from, store.refresh(df_new, dates=self.cases.dates))
+
+        # rows are not aligned anymore when the countries list changed
+        if not self.cases.countries.equals(countries):
+            col_from = 0
+        self.update(col_from)
+        return col_from
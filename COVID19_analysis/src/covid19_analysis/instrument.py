@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Timing instrumentation of the pipeline (loading, aggregation, figures, display).
+
+    import covid19_analysis.instrument as instrument
+    instrument.enable(memory=True)
+    dataPlot.last_daily_cases(df_data, ['France', 'Italy'])
+    instrument.to_chrome_trace('trace.json')    # open with chrome://tracing or https://ui.perfetto.dev
+
+Each call of an instrumented function (or span block) records its wall time, the number
+of rows of its first argument and, with memory=True, the peak memory allocated during the
+call (tracemalloc, slows down the calls). Records are kept in an in-process registry.
+Disabled by default: an instrumented call costs a flag check, set COVID19_INSTRUMENT=1
+in the environment to enable it at import.
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+import tracemalloc
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Registry state
+_enabled = False
+_memory = False
+_records = []
+_local = threading.local()     # stack of the running spans, per thread
+_origin = time.perf_counter()
+
+
+# Start recording
+def enable(memory=False):
+    '''Enable the instrumentation
+        memory:     <boolean> trace the memory allocated by each call (tracemalloc)
+        '''
+    global _enabled, _memory
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _enabled = True
+
+
+# Stop recording (records are kept)
+def disable():
+    global _enabled, _memory
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled = _memory = False
+
+
+# Clear the registry
+def reset():
+    del _records[:]
+
+
+def is_enabled():
+    return _enabled
+
+
+# Recorded calls
+def records():
+    '''Return the recorded calls as a list of dicts: name, start & duration [s], rows, bytes (None without
+    memory tracing), depth (nesting level) and thread'''
+    return list(_records)
+
+
+# Number of rows of an argument (dataframe, array, store, list...)
+def _rows(obj):
+    if hasattr(obj, '_fields'):    # metrics results (namedtuple), no rows
+        return None
+    shape = getattr(obj, 'shape', None)
+    if shape is None:
+        values = getattr(obj, 'values', None)    # JHUStore
+        shape = getattr(values, 'shape', None)
+    if shape:
+        return int(shape[0])
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+# Timed block
+class span(object):
+    '''Record the wall time (and allocated memory) of a block: with span('dataPlot.show'): fig.show()
+        name:       <string> record name
+        rows:       <int> number of rows processed
+    Does nothing when the instrumentation is disabled
+    '''
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self._on = _enabled
+        if self._on:
+            self._stack = getattr(_local, 'stack', None)
+            if self._stack is None:
+                self._stack = _local.stack = []
+            self._mem = _memory and tracemalloc.is_tracing()
+            if self._mem:
+                current = _fold_peak(self._stack)
+                self._stack.append([current, current])
+            else:
+                self._stack.append(None)
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if not self._on:
+            return
+        end = time.perf_counter()
+        n_bytes = None
+        if self._mem:
+            _fold_peak(self._stack)
+            start_mem, peak = self._stack[-1]
+            n_bytes = peak - start_mem
+        self._stack.pop()
+        _records.append({'name': self.name, 'start': self._start - _origin, 'duration': end - self._start,
+                         'rows': self.rows, 'bytes': n_bytes, 'depth': len(self._stack),
+                         'thread': threading.current_thread().ident})
+
+
+# Update the peak memory of the running spans, restart the peak tracking
+def _fold_peak(stack):
+    current, peak = tracemalloc.get_traced_memory()
+    for frame in stack:
+        if frame is not None:
+            frame[1] = max(frame[1], peak)
+    if hasattr(tracemalloc, 'reset_peak'):    # python >= 3.9, the global peak is used otherwise
+        tracemalloc.reset_peak()
+    return current
+
+
+# Decorator recording each call of a function
+def instrumented(func):
+    '''Record the calls of func as '<module>.<function>', rows are counted on the first argument'''
+    name = '%s.%s' % (func.__module__.rsplit('.', 1)[-1], func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with span(name, _rows(args[0]) if args else None):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# Aggregated view of the records
+def summary():
+    '''Return {name: {'calls', 'total', 'max', 'rows', 'bytes'}} over the recorded calls (time in s)'''
+    res = {}
+    for rec in _records:
+        item = res.setdefault(rec['name'], {'calls': 0, 'total': 0., 'max': 0., 'rows': 0, 'bytes': 0})
+        item['calls'] += 1
+        item['total'] += rec['duration']
+        item['max'] = max(item['max'], rec['duration'])
+        item['rows'] += rec['rows'] or 0
+        item['bytes'] = max(item['bytes'], rec['bytes'] or 0)
+    return res
+
+
+# Export the records as JSON
+def to_json(path=None):
+    '''Return the records as a JSON string, written to path if given'''
+    text = json.dumps({'records': _records, 'summary': summary()}, indent=1)
+    if path is not None:
+        with open(path, 'w') as f:
+            f.write(text)
+    return text
+
+
+# Export the records in the Chrome trace event format
+def to_chrome_trace(path=None):
+    '''Return the records as a Chrome trace (complete events, times in us), written to path if given'''
+    pid = os.getpid()
+    events = [{'name': rec['name'], 'cat': rec['name'].split('.', 1)[0], 'ph': 'X', 'pid': pid, 'tid': rec['thread'],
+               'ts': rec['start'] * 1e6, 'dur': rec['duration'] * 1e6,
+               'args': {'rows': rec['rows'], 'bytes': rec['bytes']}} for rec in _records]
+    text = json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
+    if path is not None:
+        with open(path, 'w') as f:
+            f.write(text)
+    return text
+
+
+if os.environ.get('COVID19_INSTRUMENT', '') not in ('', '0'):
+    enable(memory=os.environ.get('COVID19_INSTRUMENT') == 'memory')
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+import os
+import io
+import hashlib
+import urllib.request
+
+import pandas as pd
+import numpy as np
+
+from covid19_analysis import __version__
+from covid19_analysis.store import JHUStore, SPFStore, USStore, JHUMetrics, jhu_dates
+from covid19_analysis.instrument import instrumented
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Data sources
+JHU_URL = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/'
+JHU_FILES = {
+    'confirmed': 'time_series_covid19_confirmed_global.csv',
+    'deaths': 'time_series_covid19_deaths_global.csv',
+    'recovered': 'time_series_covid19_recovered_global.csv',
+}
+JHU_US_FILES = {
+    'confirmed': 'time_series_covid19_confirmed_US.csv',
+    'deaths': 'time_series_covid19_deaths_US.csv',
+}
+SPF_URL = 'https://raw.githubusercontent.com/opencovid19-fr/data/master/dist/'
+SPF_FILE = 'chiffres-cles.csv'
+
+# SPF columns layout
+SPF_LABEL_COLUMNS = ['granularite', 'maille_code', 'maille_nom', 'source_nom', 'source_type']
+SPF_COUNT_COLUMNS = ['cas_confirmes', 'cas_ehpad', 'cas_confirmes_ehpad', 'cas_possibles_ehpad', 'deces',
+                     'deces_ehpad', 'reanimation', 'hospitalises', 'nouvelles_hospitalisations',
+                     'nouvelles_reanimations', 'gueris', 'depistes']
+
+# Columns read by the streaming SPF loader by default
+SPF_STREAM_COLUMNS = ['date', 'granularite', 'maille_code', 'maille_nom', 'source_nom',
+                      'cas_confirmes', 'deces', 'reanimation', 'hospitalises', 'gueris']
+
+# Sources kept first when several sources report the same area & date, a name matches an entry starting it
+# ('ARS' stands for every regional health agency), unlisted sources come last
+SPF_SOURCE_PRIORITY = ['Ministère des Solidarités et de la Santé', 'ARS', 'Santé publique France', 'OpenCOVID19-fr']
+
+# Local cache folder for the typed tables
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'covid19_analysis')
+# Version of the cached tables layout, to increase when a parser (jhu_long, _type_spf...) output changes
+CACHE_VERSION = 2
+
+
+# pyarrow is an optional dependency (heavy to import), loaded only when the cache is used
+def _feather():
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        feather = None
+    return feather
+
+
+# Read the raw bytes of a data file from an url or a local folder
+def read_raw(file_name, source):
+    '''Return the raw content of a data file
+        file_name:  <string> name of the file within the source
+        source:     <string> base url or local directory containing the file
+        '''
+    if os.path.isdir(source):
+        with open(os.path.join(source, file_name), 'rb') as f:
+            return f.read()
+    with urllib.request.urlopen(source + file_name) as response:
+        return response.read()
+
+
+# Cache key of a raw file parsed by a parser (parser name, cache layout & package versions)
+def _cache_key(raw, parser):
+    tag = '%s.%s:%d:%s' % (parser.__module__, parser.__qualname__, CACHE_VERSION, __version__)
+    return hashlib.sha1(tag.encode('utf-8') + b'\0' + raw).hexdigest()[:16]
+
+
+# Cached typed table, parse raw data only when the file content (or the parser) changed
+def cached_table(name, raw, parser, cache_dir=None):
+    '''Return the typed table for a raw file, reading it from the cache when the file & parser are known.
+        name:       <string> table name, prefix of the cache file
+        raw:        <bytes> raw file content
+        parser:     <function> build the typed dataframe from the raw content
+        cache_dir:  <string> cache folder, CACHE_DIR by default. Cache is disabled if pyarrow is not installed
+    The cache is an uncompressed Feather (arrow) file read with a memory map: numeric & date columns without
+    empty cells are zero-copy read-only views on the mapped file, the other columns (labels, nullable counts)
+    are copied into pandas.
+        '''
+    feather = _feather()
+    if feather is None:
+        return parser(raw)
+
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    cache_file = os.path.join(cache_dir, '%s-%s.feather' % (name, _cache_key(raw, parser)))
+
+    if os.path.isfile(cache_file):
+        return feather.read_table(cache_file, memory_map=True).to_pandas(split_blocks=True)
+
+    df = parser(raw)
+    os.makedirs(cache_dir, exist_ok=True)
+    feather.write_feather(df, cache_file, compression='uncompressed')
+    return df
+
+
+# Convert a JHU wide dataframe into a typed long table
+def jhu_long(df_jhu):
+    '''Reshape a JHU wide dataframe into a long table sorted by region then date, with columns:
+        Province/State & Country/Region (categorical), Lat & Long (float), date (datetime64), value (int32)
+        '''
+    dates = jhu_dates(df_jhu.columns[4:])
+    n_regions, n_dates = len(df_jhu), dates.size
+    values = np.nan_to_num(df_jhu.iloc[:, 4:].to_numpy(dtype=float)).astype(np.int32)
+
+    df_long = pd.DataFrame({
+        'Province/State': pd.Categorical(np.repeat(df_jhu['Province/State'].values, n_dates)),
+        'Country/Region': pd.Categorical(np.repeat(df_jhu['Country/Region'].values, n_dates)),
+        'Lat': np.repeat(df_jhu['Lat'].values, n_dates),
+        'Long': np.repeat(df_jhu['Long'].values, n_dates),
+        'date': np.tile(dates.values, n_regions),
+        'value': values.ravel(),
+    })
+    return df_long
+
+
+# Convert a long table built by jhu_long back to the JHU wide layout
+def jhu_wide(df_long):
+    '''Rebuild the JHU wide dataframe (Province/State, Country/Region, Lat, Long, dates...) from a jhu_long table'''
+    dates = pd.DatetimeIndex(df_long['date'].unique())
+    n_dates = dates.size
+
+    df_jhu = df_long.iloc[::n_dates][['Province/State', 'Country/Region', 'Lat', 'Long']].reset_index(drop=True)
+    df_jhu['Province/State'] = df_jhu['Province/State'].astype(object)
+    df_jhu['Country/Region'] = df_jhu['Country/Region'].astype(object)
+
+    # same date headers as the JHU files (m/d/yy)
+    date_cols = ['%d/%d/%s' % (d.month, d.day, d.strftime('%y')) for d in dates]
+    values = pd.DataFrame(df_long['value'].values.reshape(-1, n_dates), columns=date_cols)
+    return pd.concat([df_jhu, values], axis=1)
+
+
+# Parse the raw JHU csv
+def _parse_jhu(raw):
+    return jhu_long(pd.read_csv(io.BytesIO(raw)))
+
+
+# Parse the raw JHU US csv (wide layout kept, counties x dates)
+def _parse_jhu_us(raw):
+    return pd.read_csv(io.BytesIO(raw), dtype={'Admin2': object, 'Province_State': object, 'Combined_Key': object})
+
+
+# Typed SPF table: datetime dates (malformed dates dropped), categorical labels & Int32 counts
+def _type_spf(df_spf):
+    # some rows have malformed dates, they are dropped
+    df_spf['date'] = pd.to_datetime(df_spf['date'], format='%Y-%m-%d', errors='coerce')
+    df_spf = df_spf.loc[df_spf['date'].notna()].reset_index(drop=True)
+
+    for c in SPF_LABEL_COLUMNS:
+        if c in df_spf:
+            df_spf[c] = df_spf[c].astype('category')
+    for c in SPF_COUNT_COLUMNS:
+        if c in df_spf:
+            df_spf[c] = df_spf[c].astype('Int32')
+    return df_spf
+
+
+# Parse the raw SPF csv into a typed table
+def _parse_spf(raw):
+    return _type_spf(pd.read_csv(io.BytesIO(raw), dtype={c: 'category' for c in SPF_LABEL_COLUMNS}))
+
+
+# Load a JHU timeseries as a typed long table
+@instrumented
+def read_jhu(metric='confirmed', source=JHU_URL, cache_dir=None):
+    '''Load a JHU time series file as a typed long table (see jhu_long)
+        metric:     <string> JHU file to load, options are 'confirmed', 'deaths' & 'recovered'
+        source:     <string> base url or local directory with the JHU files, JHU repository by default
+        cache_dir:  <string> cache folder, CACHE_DIR by default
+        '''
+    raw = read_raw(JHU_FILES[metric], source)
+    return cached_table('jhu_' + metric, raw, _parse_jhu, cache_dir)
+
+
+# Load a JHU timeseries as an indexed store
+@instrumented
+def read_jhu_store(metric='confirmed', source=JHU_URL, cache_dir=None, compact=False, dates=None):
+    '''Load a JHU time series file as a JHUStore, ready for the dataFun & dataPlot routines
+        compact:    <boolean> int32 counts & categorical labels (see JHUStore)
+        dates:      <DatetimeIndex> dates index shared with stores of other metrics, used when equal
+        '''
+    return JHUStore(jhu_wide(read_jhu(metric, source, cache_dir)), dtype=np.int32 if compact else np.int64, dates=dates)
+
+
+# Load the confirmed, deaths & recovered JHU files aligned on dates
+@instrumented
+def read_jhu_metrics(source=JHU_URL, cache_dir=None, countries=None, mainland=True, compact=False):
+    '''Load the three JHU time series files as a JHUMetrics (metric x country x date) array, aligned on dates
+        source:     <string> base url or local directory with the JHU files, JHU repository by default
+        cache_dir:  <string> cache folder, CACHE_DIR by default
+        countries:  <list> Country/Region names to keep, all countries by default
+        mainland:   <boolean> mainland rules (True) or sum of all Province/State (False)
+        compact:    <boolean> int32 regions matrix of the intermediate stores (see JHUStore)
+        '''
+    stores, dates = {}, None
+    for metric in JHUMetrics.metrics:
+        stores[metric] = read_jhu_store(metric, source, cache_dir, compact, dates)
+        dates = stores[metric].dates
+    return JHUMetrics(stores, countries, mainland)
+
+
+# Load a JHU US counties timeseries as a hierarchical store
+@instrumented
+def read_jhu_us(metric='confirmed', source=JHU_URL, cache_dir=None, compact=False):
+    '''Load a JHU US time series file (counties) as a USStore: country, states & counties series by name or FIPS
+        metric:     <string> JHU US file to load, options are 'confirmed' & 'deaths'
+        source:     <string> base url or local directory with the JHU files, JHU repository by default
+        cache_dir:  <string> cache folder, CACHE_DIR by default
+        compact:    <boolean> int32 counties counts (rollups stay int64)
+        '''
+    raw = read_raw(JHU_US_FILES[metric], source)
+    df_us = cached_table('jhu_us_' + metric, raw, _parse_jhu_us, cache_dir)
+    return USStore(df_us, dtype=np.int32 if compact else np.int64)
+
+
+# Load the opencovid19-fr key figures as a typed table
+@instrumented
+def read_spf(source=SPF_URL, cache_dir=None):
+    '''Load the opencovid19-fr chiffres-cles file with datetime dates, categorical labels & Int32 counts
+        source:     <string> base url or local directory with chiffres-cles.csv, opencovid19-fr repository by default
+        cache_dir:  <string> cache folder, CACHE_DIR by default
+        '''
+    raw = read_raw(SPF_FILE, source)
+    return cached_table('spf', raw, _parse_spf, cache_dir)
+
+
+# Stream the SPF key figures, filtering rows while reading
+@instrumented
+def read_spf_chunks(source=SPF_URL, granularites=None, sources=None, mailles=None, usecols=SPF_STREAM_COLUMNS,
+                    chunksize=100000):
+    '''Read the opencovid19-fr chiffres-cles file by chunks, only the selected rows & columns are kept in memory
+        source:         <string> base url or local directory with chiffres-cles.csv, opencovid19-fr repository by default
+        granularites:   <list> granularite values to keep (e.g. ['pays', 'region']), all by default
+        sources:        <list> source_nom values to keep, all by default
+        mailles:        <list> maille_nom values to keep, all by default
+        usecols:        <list> columns to read if present, SPF_STREAM_COLUMNS by default (None for all columns)
+        chunksize:      <int> number of csv lines parsed at once
+    Returns the filtered table typed as read_spf
+        '''
+    path = os.path.join(source, SPF_FILE) if os.path.isdir(source) else source + SPF_FILE
+    filters = [('granularite', granularites), ('source_nom', sources), ('maille_nom', mailles)]
+    filters = [(c, set(values)) for c, values in filters if values is not None]
+
+    # labels stay strings until the end (chunks categories differ), counts as float (empty cells)
+    dtype = dict((c, str) for c in SPF_LABEL_COLUMNS)
+    dtype.update((c, float) for c in SPF_COUNT_COLUMNS)
+
+    # columns missing from the file (older versions) are skipped
+    if usecols is not None:
+        columns = set(usecols)
+        usecols = lambda c: c in columns
+
+    chunks = []
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        keep = np.ones(len(chunk), dtype=bool)
+        for c, values in filters:
+            keep &= chunk[c].isin(values).values
+        chunks.append(chunk.loc[keep])
+
+    return _type_spf(pd.concat(chunks, ignore_index=True))
+
+
+# Rank of each source_nom following a priority list (lower is preferred)
+def _source_rank(source_nom, priority):
+    names = pd.Categorical(source_nom)
+    ranks = np.array([next((r for r, p in enumerate(priority) if str(name).startswith(p)), len(priority))
+                      for name in names.categories] + [len(priority) + 1])
+    return ranks[names.codes]   # code -1 (empty source) takes the last rank
+
+
+# Collapse the rows reported by several sources into one row per area & date
+@instrumented
+def reconcile_spf(df_spf, priority=SPF_SOURCE_PRIORITY, tolerance=0):
+    '''Merge the SPF sources: each count is taken from the preferred source reporting it for the (area, date),
+    empty counts are then forward filled within each area. A single groupby pass over the whole table.
+        df_spf:     <dataframe> chiffres-cles table (see read_spf or read_spf_chunks)
+        priority:   <list> source_nom prefixes ordered by preference, SPF_SOURCE_PRIORITY by default
+        tolerance:  <int> maximum difference between sources before a count is flagged as a conflict
+    Returns one row per (granularite, maille_code, date) sorted by area & date, source_nom is the preferred
+    source of the row, n_sources the number of reporting sources and conflict is True when the sources disagree
+        '''
+    keys = ['granularite', 'maille_code', 'date']
+    counts = [c for c in SPF_COUNT_COLUMNS if c in df_spf]
+
+    df_rank = df_spf.assign(_rank=_source_rank(df_spf['source_nom'], priority))
+    df_rank = df_rank.sort_values(keys + ['_rank'], kind='mergesort')
+
+    # first() skips empty cells, so each count comes from the preferred source having it
+    aggs = {'maille_nom': ('maille_nom', 'first'), 'source_nom': ('source_nom', 'first'),
+            'n_sources': ('_rank', 'size')}
+    for c in counts:
+        aggs[c] = (c, 'first')
+        aggs[c + '_min'] = (c, 'min')
+        aggs[c + '_max'] = (c, 'max')
+    df_rec = df_rank.groupby(keys, observed=True, sort=True).agg(**aggs).reset_index()
+
+    conflict = np.zeros(len(df_rec), dtype=bool)
+    for c in counts:
+        spread = df_rec.pop(c + '_max').astype(float) - df_rec.pop(c + '_min').astype(float)
+        conflict |= (spread > tolerance).values
+
+    # forward fill the empty counts within each area (rows are sorted by area & date)
+    area = np.cumsum(np.append(True, (df_rec['granularite'].values[1:] != df_rec['granularite'].values[:-1])
+                               | (df_rec['maille_code'].values[1:] != df_rec['maille_code'].values[:-1])))
+    rows = np.arange(len(df_rec))
+    for c in counts:
+        values = df_rec[c].astype(float).values
+        last = np.maximum.accumulate(np.where(np.isnan(values), 0, rows)) if len(rows) else rows
+        filled = np.where(area[last] == area, values[last], np.nan)
+        df_rec[c] = pd.Series(filled).astype(df_spf[c].dtype)
+
+    df_rec['conflict'] = conflict
+    return df_rec
+
+
+# Load the SPF key figures as a partitioned store
+@instrumented
+def read_spf_store(source=SPF_URL, granularites=None, sources=None, mailles=None, usecols=SPF_STREAM_COLUMNS,
+                   priority=SPF_SOURCE_PRIORITY):
+    '''Stream the chiffres-cles file (see read_spf_chunks) into a SPFStore, with one partition per
+    (granularite, maille_code) for direct country, region & department lookups.
+    Sources are merged at ingest by reconcile_spf following priority, all source rows are kept if priority is None'''
+    df_spf = read_spf_chunks(source, granularites, sources, mailles, usecols)
+    if priority is not None:
+        df_spf = reconcile_spf(df_spf, priority)
+    return SPFStore(df_spf)
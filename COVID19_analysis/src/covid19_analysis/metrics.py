@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import pandas as pd
+import numpy as np
+from collections import namedtuple
+
+# import local functions
+import covid19_analysis.dataFun as dataFun
+from covid19_analysis.store import SPFStore
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Results of each chart, plain arrays ready for any output (figures, tables, reports)
+LastDaily = namedtuple('LastDaily', ['names', 'dates', 'daily'])
+Growth = namedtuple('Growth', ['dates', 'ratio'])
+Trace = namedtuple('Trace', ['name', 'x', 'y'])
+DoublingReferences = namedtuple('DoublingReferences', ['days', 'rates', 'labels', 'curves', 'annotations'])
+CountriesSeries = namedtuple('CountriesSeries', ['names', 'dates', 'data'])
+Rates = namedtuple('Rates', ['dates', 'recovery', 'fatality'])
+Cumulative = namedtuple('Cumulative', ['dates', 'cases', 'recov', 'death'])
+Daily = namedtuple('Daily', ['dates', 'cases', 'death', 'recov'])
+Current = namedtuple('Current', ['dates', 'ongoing', 'death'])
+
+# Reference doubling rates used on doubling time charts
+DOUBLING_RATES = [1, 2, 3, 5, 7, 30]
+DOUBLING_LABELS = ['daily', 'two days', 'three days', 'five days', 'weekly', 'monthly']
+DOUBLING_ANNOTATIONS = [(9, 'Doubles every day'), (19, 'Doubles every 2nd day'), (29, 'Doubles every 3rd day'),
+                        (31, 'Doubles every 5th day'), (33, 'Doubles every week'), (35, 'Doubles every month')]
+
+
+# Boolean vector for the period to display
+def period_mask(dates, mask=0):
+    '''Return the mask to apply over dates, all period if mask is 0 (default)'''
+    if np.ndim(mask) == 0:
+        return np.ones(len(dates), dtype=bool)
+    return np.asarray(mask)
+
+
+# SPF counts as integers, empty cells (NaN or NA of the typed tables) as zero
+def _counts(values):
+    return np.array(pd.Series(values).fillna(0), dtype=int)
+
+
+# Daily variation of cumulative counts, first day kept as is (negative values set to zero)
+def _daily_from_first(values):
+    data_tmp = _counts(values)
+    data_tmp[data_tmp < 0] = 0
+    data_d = data_tmp[1:] - data_tmp[:data_tmp.size - 1]
+    return np.insert(data_d, 0, data_tmp[0]).clip(min=0)
+
+
+# Decimated rows of a (rows x dates) matrix
+def decimate_rows(dates, data, max_points=None, method='lttb'):
+    '''Keep at most max_points points per row (see dataFun.decimate), nothing is done if max_points is None.
+    Returns the dates, a (rows x points) datetime64 array when decimated, and the (rows x points) data
+        '''
+    if max_points is None or len(dates) <= max_points:
+        return dates, data
+    index = dataFun.decimate(data, max_points, method)
+    return np.asarray(dates)[index], np.take_along_axis(np.asarray(data), index, axis=1)
+
+
+# Last days daily cases per country
+def last_daily_cases(df_data, ctry_list, num_days=3*31, rolling_win=True, max_points=None, method='lttb'):
+    '''Daily cases of several countries over the last days (see dataPlot.last_daily_cases)
+        df_data:    <dataframe> contain all countries daily data (or a JHUStore)
+        ctry_list:  <list> string list with countries
+        num_days:   <int> set the number of days rolling back from the last day
+        rolling_win:<boolean> set weakly rolling window with center on the day
+        max_points: <int> points budget per country, all days by default (see decimate_rows)
+        method:     <string> decimation method, 'lttb' or 'minmax'
+        '''
+    data, dates = dataFun.get_countries_matrix(df_data, ctry_list)
+    res = dataFun.last_daily_matrix(data, dates, num_days=num_days, rolling_win=rolling_win)
+    dates, daily = decimate_rows(res.dates, res.rolling if rolling_win else res.daily, max_points, method)
+    return LastDaily(list(ctry_list), dates, daily)
+
+
+# Growth ratio between consecutive days
+def growth_rates(data_ts):
+    '''Growth ratio over time for one timeserie (see dataPlot.growth_rates)'''
+    data_tmp = np.array(data_ts, dtype=int)
+    return Growth(data_ts.index[1:], dataFun.safe_div(data_tmp[1:], data_tmp[:-1]))
+
+
+# Reference curves for doubling time charts
+def doubling_references(pop_th=100, num_days=37, rates=None):
+    '''Reference population curves for each doubling rate and the annotations points (day, log10(cases), text)
+        pop_th:     <int> population threshold, chart starting point
+        num_days:   <int> set the number of days
+        rates:      <list> doubling rates [days], DOUBLING_RATES by default
+    Results are memoized and shared between calls, the curves (rates x days) array is read-only
+        '''
+    rates = DOUBLING_RATES if rates is None else rates
+    return _doubling_references(pop_th, num_days, tuple(rates))
+
+
+@functools.lru_cache(maxsize=32)
+def _doubling_references(pop_th, num_days, rates):
+    days = np.arange(num_days)
+    gr_values = np.array(rates)
+    # all the curves from one broadcast expression
+    curves = dataFun.doubling_time_equation(pop_th, days[np.newaxis, :], gr_values[:, np.newaxis])
+
+    ref_labels = dict(zip(DOUBLING_RATES, DOUBLING_LABELS))
+    labels = tuple(ref_labels.get(gr_value, 'every %g days' % (gr_value)) for gr_value in rates)
+
+    # annotations only for the standard rates
+    ref_annotations = dict(zip(DOUBLING_RATES, DOUBLING_ANNOTATIONS))
+    points = [ref_annotations[gr_value] + (gr_value,) for gr_value in rates if gr_value in ref_annotations]
+    log_cases = np.log10(dataFun.doubling_time_equation(pop_th, np.array([p[0] for p in points], dtype=int),
+                                                        np.array([p[2] for p in points])))
+    annotations = tuple((day, y, text) for (day, text, _), y in zip(points, log_cases))
+
+    days.setflags(write=False)
+    curves.setflags(write=False)
+    return DoublingReferences(days, rates, labels, curves, annotations)
+
+
+# Traces of regions aligned on their epidemic days
+def _aligned_traces(names, data, dates, pop_th, day_filter=np.nan, clear_pop=False):
+    baseline = None if pd.isna(day_filter) else day_filter
+    aligned = dataFun.align_days(data, dates, pop_th*.5, baseline, clear_pop and baseline is not None)
+    traces = []
+    for r_idx, name in enumerate(names):
+        n, start = aligned.length[r_idx], aligned.start[r_idx]
+        ts_country = pd.Series(aligned.data[r_idx, :n].astype(np.int64), index=dates[start:start + n])
+        traces.append(Trace(name, np.arange(n), ts_country))
+    return traces
+
+
+# One country cases aligned on the first days above a threshold
+def doubling_trace(ts_country, name, pop_th=100, day_filter=np.nan, clear_pop=False):
+    '''Trace of one country timeseries for the doubling time chart, days counted from the first day above pop_th/2'''
+    return _aligned_traces([name], ts_country.values[np.newaxis, :], ts_country.index, pop_th, day_filter, clear_pop)[0]
+
+
+# Rows of the location when the SPF data is a SPFStore (sources reconciled at ingest)
+def spf_area(df_data, loc_name):
+    '''Rows of loc_name when df_data is a SPFStore, df_data itself otherwise (rows of one area already)'''
+    if isinstance(df_data, SPFStore):
+        return df_data.get(loc_name)
+    return df_data
+
+
+# Countries cases aligned on the first days above a threshold
+def growing_ratio_countries(df_data, ctry_list, pop_th=100, df_source='JHU', day_filter=np.nan, clear_pop=False, verbose=True):
+    '''Traces for the doubling time chart (see dataPlot.growing_ratio_countries), list of Trace(name, x, y)
+        verbose:    <boolean> display messages from JHU data extraction
+    JHU countries are aligned together from one (countries x dates) matrix, see dataFun.align_days
+        '''
+    traces = []
+    if df_source == 'JHU':
+        data, dates = dataFun.get_countries_matrix(df_data, ctry_list, verbose=verbose)
+        traces = _aligned_traces(ctry_list, data, dates, pop_th, day_filter, clear_pop)
+
+    elif df_source == 'raw_data':
+        data_flt = df_data > pop_th
+        traces.append(Trace(ctry_list, np.array(range(0, len(data_flt))), df_data[data_flt]))
+
+    elif df_source == 'SPF':
+        df_data = spf_area(df_data, ctry_list)
+        ts_cases = pd.Series(data=df_data.cas_confirmes.fillna(0).values, index=df_data.date)
+        ts_ftlts = pd.Series(data=df_data.deces.fillna(0).values, index=df_data.date)
+
+        # post first-outbreak filters
+        if not pd.isna(day_filter):    # a time filter is included
+            ts_cases = ts_cases[ts_cases.index >= day_filter]
+            ts_ftlts = ts_ftlts[ts_ftlts.index >= day_filter]
+
+            if clear_pop:   # substract first date population
+                ts_cases = ts_cases - ts_cases.iloc[0]
+                ts_ftlts = ts_ftlts - ts_ftlts.iloc[0]
+
+        t_idx = ts_cases > pop_th
+        traces.append(Trace('Cases', np.array(range(0, ts_cases[t_idx].size)), ts_cases[t_idx]))
+        traces.append(Trace('Fatalities', np.array(range(0, ts_ftlts[t_idx].size)), ts_ftlts[t_idx]))
+
+    return traces
+
+
+# Countries cases over time
+def countries_comp(df_data, ctry_list, mask=0, max_points=None, method='lttb', verbose=True):
+    '''Countries timeseries over the period to display (see dataPlot.disp_countries_comp)
+        verbose:    <boolean> display messages from JHU data extraction
+        '''
+    data, dates = dataFun.get_countries_matrix(df_data, ctry_list, verbose=verbose)
+    mask = period_mask(dates, mask)
+    dates, data = decimate_rows(dates[mask], data[:, mask], max_points, method)
+    return CountriesSeries(list(ctry_list), dates, data)
+
+
+# Recoveries and fatalities rates faces to all cases
+def country_rates(ts_case, ts_recov, ts_death, mask=0):
+    '''Recovery & fatality rates [%] over the period to display (see dataPlot.disp_country_rates_jhu)'''
+    mask = period_mask(ts_case.index, mask)
+    rate_recov = dataFun.safe_div(ts_recov.values, ts_case.values) *100
+    rate_death = dataFun.safe_div(ts_death.values, ts_case.values) *100
+    return Rates(ts_case.index[mask], rate_recov[mask], rate_death[mask])
+
+
+# Cumulative cases, recoveries and fatalities
+def cum_jhu(ts_case, ts_recov, ts_death, mask=0, max_points=None, method='lttb'):
+    '''Cumulative data over the period to display (see dataPlot.disp_cum_jhu), with max_points the dates are
+    decimated per series: (3 x points) array for cases, recov & death'''
+    mask = period_mask(ts_case.index, mask)
+    data = np.stack([ts_case.values[mask], ts_recov.values[mask], ts_death.values[mask]])
+    dates, data = decimate_rows(ts_case.index[mask], data, max_points, method)
+    return Cumulative(dates, data[0], data[1], data[2])
+
+
+# Daily cases, fatalities & recoveries
+def daily_cases(df_data, df_source='JHU', mask=0):
+    '''Daily cases over the period to display (see dataPlot.disp_daily_cases), recov is None for SPF source
+        df_data:    <dataframe> daily information per case
+        df_source:  <string> select the type of dataframe source, 'JHU' or 'SPF'
+        '''
+    if df_source == 'SPF':
+        date_time = pd.DataFrame(index=df_data.date).index
+        cases_d = _daily_from_first(df_data.cas_confirmes)
+        death_d = _daily_from_first(df_data.deces)
+        recov_d = None
+
+    elif df_source == 'JHU':
+        date_time = df_data.index
+        cases_d = _daily_from_first(df_data.cases)
+        death_d = _daily_from_first(df_data.death)
+        recov_d = _daily_from_first(df_data.recov)
+
+    else:
+        raise ValueError('Not valid value for df_source: %s' % (df_source))
+
+    mask = period_mask(date_time, mask)
+    return Daily(date_time[mask], cases_d[mask], death_d[mask], None if recov_d is None else recov_d[mask])
+
+
+# On going cases from cumulative cases and fatalities
+def current_cases(df_data, pop_factor=1):
+    '''Current cases and fatalities divided by pop_factor (see dataPlot.disp_current_cases)'''
+    fat_c = _counts(df_data.deces)
+    fat_c[fat_c<0] = 0
+    liv_c = _counts(df_data.cas_confirmes) - fat_c
+    return Current(df_data.date, liv_c / pop_factor, fat_c / pop_factor)
+
+
+# Cumulative cases and fatalities from SPF dataset
+def cumulative(df_data):
+    '''Cumulative cases & fatalities (see dataPlot.disp_cumulative), recov is None for SPF source'''
+    return Cumulative(df_data.date, _counts(df_data.cas_confirmes), None, _counts(df_data.deces))
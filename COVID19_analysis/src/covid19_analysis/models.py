@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Solutions, one row per scenario and one column per time point
+SIRResult = namedtuple('SIRResult', ['t', 'S', 'I', 'R'])
+SEIRResult = namedtuple('SEIRResult', ['t', 'S', 'E', 'I', 'R'])
+
+
+# SIR model differential equations for a batch of scenarios
+def sir_deriv(y, N, beta, gamma):
+    '''SIR equations, y: <array> (n_scenarios x 3) with S, I, R columns, parameters are (n_scenarios,) arrays
+        dS/dt = -beta*S*I/N,  dI/dt = beta*S*I/N - gamma*I,  dR/dt = gamma*I
+        '''
+    S, I = y[:, 0], y[:, 1]
+    infection = beta * S * I / N
+    recovery = gamma * I
+    return np.stack([-infection, infection - recovery, recovery], axis=1)
+
+
+# SEIR model differential equations for a batch of scenarios
+def seir_deriv(y, N, beta, gamma, sigma):
+    '''SEIR equations, y: <array> (n_scenarios x 4) with S, E, I, R columns, sigma is the incubation rate (1/days)'''
+    S, E, I = y[:, 0], y[:, 1], y[:, 2]
+    infection = beta * S * I / N
+    incubation = sigma * E
+    recovery = gamma * I
+    return np.stack([-infection, infection - incubation, incubation - recovery, recovery], axis=1)
+
+
+# Fixed step Runge-Kutta 4 integration of a batch of systems
+def rk4(deriv, y0, t, params, substeps=4):
+    '''Integrate dy/dt = deriv(y, *params) for all scenarios at once.
+        deriv:      <function> derivatives of a (n_scenarios x compartments) state
+        y0:         <array> initial conditions (n_scenarios x compartments)
+        t:          <array> time points of the output, the first one is the initial time
+        params:     <tuple> parameters arrays (n_scenarios,) passed to deriv
+        substeps:   <int> number of RK4 steps between two time points
+    Returns an array (n_scenarios x compartments x time points)
+        '''
+    y = np.array(y0, dtype=float)
+    out = np.empty(y.shape + (len(t),))
+    out[..., 0] = y
+    for i in range(len(t) - 1):
+        dt = (t[i + 1] - t[i]) / substeps
+        for _ in range(substeps):
+            k1 = deriv(y, *params)
+            k2 = deriv(y + dt / 2 * k1, *params)
+            k3 = deriv(y + dt / 2 * k2, *params)
+            k4 = deriv(y + dt * k3, *params)
+            y = y + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        out[..., i + 1] = y
+    return out
+
+
+# Solve one shard of scenarios (module level so it can be sent to worker processes)
+def _solve_shard(model, y0, t, params, substeps):
+    deriv = sir_deriv if model == 'SIR' else seir_deriv
+    return rk4(deriv, y0, t, params, substeps)
+
+
+# Solve a batch of scenarios, optionally sharded over worker processes
+def _solve(model, y0, t, params, substeps, n_jobs):
+    if n_jobs == 1 or len(y0) < 2:
+        return _solve_shard(model, y0, t, params, substeps)
+
+    n_jobs = min(n_jobs or os.cpu_count(), len(y0))
+    shards = np.array_split(np.arange(len(y0)), n_jobs)
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        tasks = [pool.submit(_solve_shard, model, y0[s], t, tuple(p[s] for p in params), substeps) for s in shards]
+        return np.concatenate([task.result() for task in tasks])
+
+
+# SIR ensemble solver
+def solve_sir(N, beta, gamma, I0=1, R0=0, t=None, substeps=4, n_jobs=1):
+    '''Integrate a batch of SIR scenarios, parameters are scalars or arrays broadcast to the number of scenarios.
+        N:          <int/array> total population
+        beta:       <float/array> contact or transmission rate
+        gamma:      <float/array> recovery rate in 1/days
+        I0, R0:     <int/array> initial number of infected and recovered individuals, S0 = N - I0 - R0
+        t:          <array> grid of time points (in days), 0 to 80 days by default
+        substeps:   <int> number of RK4 steps between two time points
+        n_jobs:     <int> number of worker processes, 1 (default) solves in the current process, None for all cpus
+    Returns a SIRResult with S, I, R arrays (n_scenarios x time points)
+        '''
+    N, beta, gamma, I0, R0 = [np.atleast_1d(np.asarray(p, dtype=float)) for p in np.broadcast_arrays(N, beta, gamma, I0, R0)]
+    t = np.linspace(0, 80, 81) if t is None else np.asarray(t)
+    y0 = np.stack([N - I0 - R0, I0, R0], axis=1)
+    out = _solve('SIR', y0, np.asarray(t, dtype=float), (N, beta, gamma), substeps, n_jobs)
+    return SIRResult(t, out[:, 0], out[:, 1], out[:, 2])
+
+
+# SEIR ensemble solver
+def solve_seir(N, beta, gamma, sigma, E0=0, I0=1, R0=0, t=None, substeps=4, n_jobs=1):
+    '''Integrate a batch of SEIR scenarios (see solve_sir), sigma is the incubation rate in 1/days
+    Returns a SEIRResult with S, E, I, R arrays (n_scenarios x time points)
+        '''
+    params = np.broadcast_arrays(N, beta, gamma, sigma, E0, I0, R0)
+    N, beta, gamma, sigma, E0, I0, R0 = [np.atleast_1d(np.asarray(p, dtype=float)) for p in params]
+    t = np.linspace(0, 80, 81) if t is None else np.asarray(t)
+    y0 = np.stack([N - E0 - I0 - R0, E0, I0, R0], axis=1)
+    out = _solve('SEIR', y0, np.asarray(t, dtype=float), (N, beta, gamma, sigma), substeps, n_jobs)
+    return SEIRResult(t, out[:, 0], out[:, 1], out[:, 2], out[:, 3])
+
+
+# Compartment of all scenarios as a dataframe
+def to_frame(res, compartment='I'):
+    '''Return a (time points x scenarios) dataframe of one compartment, each column is a timeserie
+    ready for dataPlot.growth_rates or dataPlot.growing_ratio_countries(df_source='raw_data')'''
+    return pd.DataFrame(getattr(res, compartment).T, index=pd.Index(res.t, name='t'))
+
+
+# Cumulative cases of a batch of SIR scenarios, (n_scenarios x time points)
+def _sir_cumulative(N, log_beta, log_gamma, I0, n_days, substeps):
+    res = solve_sir(N, np.exp(log_beta), np.exp(log_gamma), I0, 0, t=np.arange(n_days), substeps=substeps)
+    return N[:, None] - res.S
+
+
+# Batched Levenberg-Marquardt fit of (log beta, log gamma), one problem per row
+def _calibrate_shard(obs, weight, N, p0, max_iter, tol, substeps, step=1e-4):
+    t0 = time.perf_counter()
+    n_ctry, n_days = obs.shape
+    p = p0.copy()
+    lam = np.full(n_ctry, 1e-2)
+    n_iter = np.zeros(n_ctry, dtype=int)
+    fit_time = np.zeros(n_ctry)
+    active = np.ones(n_ctry, dtype=bool)
+    log_obs = np.log1p(obs)
+    I0 = obs[:, 0]
+
+    def log_model(model):
+        return np.log1p(np.maximum(model, 0))
+
+    cost = ((weight * (log_model(_sir_cumulative(N, p[:, 0], p[:, 1], I0, n_days, substeps)) - log_obs)) ** 2).sum(axis=1)
+    fit_time += (time.perf_counter() - t0) / n_ctry
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        t0 = time.perf_counter()
+        idx = np.flatnonzero(active)
+        pa, Na, I0a, wa = p[idx], N[idx], I0[idx], weight[idx]
+
+        # model & forward finite differences on a single batched solve (3 scenarios per country)
+        log_beta = np.concatenate([pa[:, 0], pa[:, 0] + step, pa[:, 0]])
+        log_gamma = np.concatenate([pa[:, 1], pa[:, 1], pa[:, 1] + step])
+        model = _sir_cumulative(np.tile(Na, 3), log_beta, log_gamma, np.tile(I0a, 3), n_days, substeps)
+        model = log_model(model).reshape(3, idx.size, n_days)
+        r = wa * (model[0] - log_obs[idx])
+        jac = np.stack([wa * (model[k] - model[0]) / step for k in [1, 2]], axis=2)
+
+        # damped normal equations, 2x2 per country
+        jtj = np.einsum('cti,ctj->cij', jac, jac)
+        jtr = np.einsum('cti,ct->ci', jac, r)
+        damping = lam[idx, None, None] * (jtj * np.eye(2) + 1e-12 * np.eye(2))
+        delta = -np.linalg.solve(jtj + damping, jtr[..., None])[..., 0]
+        p_new = np.clip(pa + delta, np.log(1e-4), np.log(10.))
+
+        model_new = log_model(_sir_cumulative(Na, p_new[:, 0], p_new[:, 1], I0a, n_days, substeps))
+        cost_new = ((wa * (model_new - log_obs[idx])) ** 2).sum(axis=1)
+
+        # accept improving steps, adapt damping per country
+        better = cost_new < cost[idx]
+        converged = better & ((cost[idx] - cost_new) <= tol * np.maximum(cost[idx], tol))
+        converged |= np.abs(delta).max(axis=1) < tol
+        p[idx[better]] = p_new[better]
+        cost[idx[better]] = cost_new[better]
+        lam[idx] = np.where(better, lam[idx] / 3., lam[idx] * 4.)
+        n_iter[idx] += 1
+        active[idx[converged | (lam[idx] > 1e8)]] = False
+
+        # batched iteration time shared by the countries still fitted
+        fit_time[idx] += (time.perf_counter() - t0) / idx.size
+
+    n_points = np.maximum(weight.sum(axis=1), 1)
+    return p, np.sqrt(cost / n_points), n_iter, fit_time
+
+
+# SIR parameters calibration for all countries at once
+def calibrate_sir(data, N, start_th=10, num_days=None, p0=None, max_iter=50, tol=1e-6, substeps=2, n_jobs=1):
+    '''Fit beta & gamma of a SIR model per country against cumulative cases (model cumulative cases = N - S).
+    Residuals are taken on log(1 + cases) from the first day above start_th, all countries are fitted together
+    with a batched Levenberg-Marquardt (finite differences gradients computed on a single batched solve).
+        data:       <dataframe> cumulative cases (countries x dates), e.g. dataFun.aggregate_all_countries
+        N:          <int/array> population per country
+        start_th:   <int> number of cases of the first day fitted
+        num_days:   <int> number of days fitted from the first day, all remaining days by default
+        p0:         <dataframe> warm start, previous calibration result (beta & gamma columns per country)
+        max_iter:   <int> maximum number of iterations
+        tol:        <float> relative cost decrease for convergence
+        substeps:   <int> RK4 steps per day
+        n_jobs:     <int> number of worker processes, countries are split in shards (None for all cpus)
+    Returns a dataframe per country with beta, gamma, R_0 (beta/gamma), rmse (log residuals), n_iter,
+    n_days & fit_time [s] (share of the batched iterations time over the iterations the country was still
+    fitted, the fit_time sum is the fit elapsed time). Countries never above start_th are NaN.
+        '''
+    data = pd.DataFrame(data)
+    obs_all = np.nan_to_num(data.to_numpy(dtype=float))
+    N = np.broadcast_to(np.asarray(N, dtype=float), (len(data),)).copy()
+
+    # align each country on its first day above the threshold, padding is excluded by the weights
+    above = obs_all >= start_th
+    start = np.where(above.any(axis=1), above.argmax(axis=1), obs_all.shape[1])
+    n_fit = obs_all.shape[1] - start
+    if num_days is not None:
+        n_fit = np.minimum(n_fit, num_days)
+    ok = n_fit >= 3
+    n_days = int(n_fit[ok].max()) if ok.any() else 0
+    cols = start[:, None] + np.arange(n_days)
+    weight = (np.arange(n_days) < n_fit[:, None]).astype(float)
+    obs = np.where(weight > 0, obs_all[np.arange(len(data))[:, None], np.minimum(cols, obs_all.shape[1] - 1)], 0)
+    obs = np.maximum.accumulate(obs, axis=1) * weight
+
+    # initial guess, warm start from a previous fit when available
+    params = np.tile(np.log([.3, .1]), (len(data), 1))
+    if p0 is not None:
+        prev = pd.DataFrame(p0).reindex(data.index)[['beta', 'gamma']].to_numpy(dtype=float)
+        known = np.isfinite(prev).all(axis=1) & (prev > 0).all(axis=1)
+        params[known] = np.log(prev[known])
+
+    result = pd.DataFrame(np.nan, index=data.index, columns=['beta', 'gamma', 'R_0', 'rmse', 'n_iter', 'n_days', 'fit_time'])
+    rows = np.flatnonzero(ok)
+    if rows.size == 0:
+        return result
+
+    n_jobs = min(n_jobs or os.cpu_count(), rows.size)
+    shards = np.array_split(rows, n_jobs)
+    args = [(obs[s], weight[s], N[s], params[s], max_iter, tol, substeps) for s in shards]
+    if n_jobs == 1:
+        fits = [_calibrate_shard(*args[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            fits = list(pool.map(_calibrate_shard, *zip(*args)))
+
+    for s, (p, rmse, n_iter, fit_time) in zip(shards, fits):
+        beta, gamma = np.exp(p[:, 0]), np.exp(p[:, 1])
+        result.iloc[s] = np.column_stack([beta, gamma, beta / gamma, rmse, n_iter, n_fit[s], fit_time])
+    return result
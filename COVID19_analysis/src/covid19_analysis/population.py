@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import functools
+from collections import namedtuple
+
+import pandas as pd
+import numpy as np
+
+# import local functions
+import covid19_analysis.loader as loader
+from covid19_analysis.store import JHUStore
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# World Bank total population table, shipped in local_data/world_population of the source repository (not
+# installed with the package): the location is given by source, the COVID19_WORLD_BANK_DIR environment variable
+# or found in a source checkout
+WB_FILE = 'API_SP.POP.TOTL_DS2_en_csv_v2_866861.csv'
+WB_ENV = 'COVID19_WORLD_BANK_DIR'
+WB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'local_data', 'world_population')
+
+# JHU Country/Region names which differ from the World Bank country names -> World Bank country code
+# JHU entries without a World Bank population (cruise ships, Olympics, Antarctica, Holy See, Taiwan*) are left out
+JHU_ALIASES = {
+    'Bahamas': 'BHS',
+    'Brunei': 'BRN',
+    'Burma': 'MMR',
+    'Congo (Brazzaville)': 'COG',
+    'Congo (Kinshasa)': 'COD',
+    'Czechia': 'CZE',
+    'Egypt': 'EGY',
+    'Gambia': 'GMB',
+    'Iran': 'IRN',
+    'Korea, North': 'PRK',
+    'Korea, South': 'KOR',
+    'Kyrgyzstan': 'KGZ',
+    'Laos': 'LAO',
+    'Micronesia': 'FSM',
+    'Russia': 'RUS',
+    'Saint Kitts and Nevis': 'KNA',
+    'Saint Lucia': 'LCA',
+    'Saint Vincent and the Grenadines': 'VCT',
+    'Slovakia': 'SVK',
+    'Syria': 'SYR',
+    'US': 'USA',
+    'Venezuela': 'VEN',
+    'Yemen': 'YEM',
+}
+
+# Compact population table: country codes & names (Index), latest population and its year (arrays)
+Population = namedtuple('Population', ['codes', 'names', 'population', 'year'])
+
+
+# Location of the World Bank file
+def world_bank_source(source=None):
+    '''Return the World Bank file location: source if given, else the COVID19_WORLD_BANK_DIR environment variable,
+    else local_data/world_population of a source checkout. Raise FileNotFoundError when none is available'''
+    if source is not None:
+        return source
+    if os.environ.get(WB_ENV):
+        return os.environ[WB_ENV]
+    if os.path.isfile(os.path.join(WB_DIR, WB_FILE)):
+        return os.path.normpath(WB_DIR)
+    raise FileNotFoundError('World Bank population file %s not found: pass source=<directory or base url> or set '
+                            'the %s environment variable (the file is in local_data/world_population of the '
+                            'COVID19_analysis repository)' % (WB_FILE, WB_ENV))
+
+
+# Parse the World Bank table
+def read_world_bank(source=None):
+    '''Load the World Bank total population file, keep the latest available year of each country
+        source:     <string> local directory (or base url) with the World Bank file, see world_bank_source
+    Returns a Population tuple, results are cached per source
+        '''
+    return _read_world_bank(world_bank_source(source))
+
+
+@functools.lru_cache(maxsize=4)
+def _read_world_bank(source):
+    raw = loader.read_raw(WB_FILE, source)
+    df_wb = pd.read_csv(io.BytesIO(raw), skiprows=4)
+
+    years = [c for c in df_wb.columns if c.isdigit()]
+    values = df_wb[years].to_numpy(dtype=float)
+
+    # last non-empty year per country (last column is often not published yet)
+    last = values.shape[1] - 1 - np.argmax(~np.isnan(values[:, ::-1]), axis=1)
+    population = values[np.arange(len(values)), last]
+    year = np.array(years, dtype=int)[last]
+    year[np.isnan(population)] = 0
+
+    population.setflags(write=False)
+    return Population(pd.Index(df_wb['Country Code']), pd.Index(df_wb['Country Name']), population, year)
+
+
+# Population vector of a list of countries (cached mapping table)
+@functools.lru_cache(maxsize=32)
+def _country_population(countries, source):
+    wb = read_world_bank(source)
+    code_pos = dict(zip(wb.codes, range(len(wb.codes))))
+    name_pos = dict(zip(wb.names, range(len(wb.names))))
+
+    # alias first, then the World Bank name
+    pos = np.array([code_pos[JHU_ALIASES[c]] if c in JHU_ALIASES else name_pos.get(c, -1) for c in countries], dtype=int)
+    population = np.where(pos >= 0, wb.population[pos], np.nan)
+    population.setflags(write=False)
+    return population
+
+
+# Population of JHU countries
+def country_population(countries, source=None):
+    '''Population of each country, NaN when the country is not found in the World Bank table
+        countries:  <list> JHU Country/Region names
+        source:     <string> World Bank file location, see world_bank_source
+    Returns a read-only float array aligned on countries
+        '''
+    return _country_population(tuple(countries), world_bank_source(source))
+
+
+# Cases per capita of a (countries x dates) matrix
+def per_capita(data, countries=None, per=100000, mainland=True, source=None, verbose=True):
+    '''Normalize countries counts by their population with a single multiply
+        data:       <array> (countries x dates) counts, or a JHUStore (its country aggregates are used)
+        countries:  <list> country names of the data rows, taken from the store when data is a JHUStore
+        per:        <int> population unit, 100k by default
+        mainland:   <boolean> JHUStore only, mainland or all provinces aggregates (see get_timeseries_from_JHU)
+        source:     <string> World Bank file location, see world_bank_source
+        verbose:    <boolean> display the countries without population
+    Returns a float (countries x dates) array, rows of countries without population are NaN.
+    Note: the World Bank population covers the whole country, overseas territories included
+        '''
+    if isinstance(data, JHUStore):
+        countries = data.countries
+        data = data.mainland if mainland else data.provinces_sum
+
+    population = country_population(countries, source)
+    if verbose and np.isnan(population).any():
+        print('Warning: no population for %s' % (', '.join(np.asarray(countries)[np.isnan(population)])))
+    return np.asarray(data) * (per / population)[:, np.newaxis]
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import tempfile
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+import numpy as np
+
+# import local functions
+import covid19_analysis.metrics as metrics
+import covid19_analysis.figures as figures
+import covid19_analysis.export as export
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Shared memory folder (tmpfs on linux), workers map the same pages instead of receiving pickled copies
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Arrays already mapped by the current (worker) process
+_attached = {}
+
+
+# Numpy array shared between processes through a memory-mapped file
+class SharedArray(object):
+    '''Copy an array once into shared memory, workers attach it with attach_array(shared.spec).
+    Use as a context manager (or call close) to release the memory.
+        data:   <array> data to share
+    '''
+
+    def __init__(self, data):
+        data = np.ascontiguousarray(data)
+        fd, path = tempfile.mkstemp(prefix='covid19_', suffix='.bin', dir=SHM_DIR)
+        os.close(fd)
+        self.spec = (path, data.shape, data.dtype.str)
+        if data.size:
+            mm = np.memmap(path, mode='w+', shape=data.shape, dtype=data.dtype)
+            mm[...] = data
+            mm.flush()
+            del mm
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if os.path.exists(self.spec[0]):
+            os.remove(self.spec[0])
+
+
+# Map a shared array within a worker (read-only, mapped once per process)
+def attach_array(spec):
+    '''Return the read-only array described by SharedArray.spec'''
+    if spec not in _attached:
+        path, shape, dtype = spec
+        if int(np.prod(shape)) == 0:
+            _attached[spec] = np.zeros(shape, dtype=dtype)
+        else:
+            _attached[spec] = np.memmap(path, mode='r', shape=shape, dtype=np.dtype(dtype))
+    return _attached[spec]
+
+
+# Task start time written by the worker into the shared clock array
+def _clock_array(spec):
+    path, shape, dtype = spec
+    return np.memmap(path, mode='r+', shape=shape, dtype=np.dtype(dtype))
+
+
+def _run_clocked(clock_spec, slot, func, args):
+    if clock_spec not in _attached:
+        _attached[clock_spec] = _clock_array(clock_spec)
+    _attached[clock_spec][slot] = time.time()
+    return func(*args)
+
+
+# Batch outcome: results per task key and failures (error message with traceback) per task key
+RenderResults = namedtuple('RenderResults', ['results', 'failures'])
+
+
+# Run tasks over a process pool with bounded concurrency and per task timeout
+class RenderScheduler(object):
+    '''Spread independent tasks (figure building & serialization) over worker processes.
+        max_workers:    <int> number of worker processes, number of cpus by default
+        max_pending:    <int> maximum number of submitted tasks not finished yet, 2 * max_workers by default
+        timeout:        <float> maximum time [s] for one task since it started running in a worker, no limit by default
+    A failing or timed out task is reported in the failures and does not stop the batch.
+    Note: a timed out task can't be interrupted, its worker stays busy (and the pool shutdown waits) until the task ends,
+    its result is still kept when it ends.
+    '''
+
+    def __init__(self, max_workers=None, max_pending=None, timeout=None):
+        self.max_workers = max_workers or os.cpu_count()
+        self.max_pending = max_pending or 2 * self.max_workers
+        self.timeout = timeout
+
+    def run(self, func, tasks):
+        '''Run func(*args) for each (key, args) of tasks, return RenderResults'''
+        if self.timeout is None:
+            return self._run(func, tasks, None)
+        # start times [s since epoch] per pending slot, written by the workers (NaN until the task runs)
+        with SharedArray(np.full(self.max_pending, np.nan)) as shared:
+            return self._run(func, tasks, shared.spec)
+
+    def _run(self, func, tasks, clock_spec):
+        results, failures = {}, {}
+        tasks = iter(tasks)
+        pending = {}        # future -> (key, clock slot)
+        expired = set()     # timed out futures, still running in a worker
+        free_slots = list(range(self.max_pending))
+        clock = _clock_array(clock_spec) if clock_spec is not None else None
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                # keep the pool fed without queuing the whole batch, timed out tasks still hold a slot
+                for key, args in (tasks if free_slots else ()):
+                    slot = free_slots.pop()
+                    if clock is None:
+                        future = pool.submit(func, *args)
+                    else:
+                        clock[slot] = np.nan
+                        future = pool.submit(_run_clocked, clock_spec, slot, func, args)
+                    pending[future] = (key, slot)
+                    if not free_slots:
+                        break
+                if not pending:
+                    break
+
+                wait_time = None
+                if clock is not None:
+                    active = [slot for future, (_, slot) in pending.items() if future not in expired]
+                    starts = clock[active]
+                    started = starts[~np.isnan(starts)]
+                    # queued tasks have no deadline yet, poll until a worker picks them up
+                    wait_time = 0.05 if started.size < len(active) else None
+                    if started.size:
+                        deadline = max(started.min() + self.timeout - time.time(), 0)
+                        wait_time = deadline if wait_time is None else min(wait_time, deadline)
+                done, _ = wait(list(pending), timeout=wait_time, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    key, slot = pending.pop(future)
+                    expired.discard(future)
+                    free_slots.append(slot)
+                    try:
+                        results[key] = future.result()
+                    except Exception:
+                        if key not in failures:
+                            failures[key] = traceback.format_exc()
+
+                # report the tasks running for too long, keep waiting for them to free their worker
+                if clock is not None:
+                    now = time.time()
+                    for future, (key, slot) in pending.items():
+                        if future not in expired and now - clock[slot] >= self.timeout:
+                            expired.add(future)
+                            failures[key] = 'TimeoutError: task exceeded %.1f s' % (self.timeout)
+
+        return RenderResults(results, failures)
+
+
+# Worker task: compute, build & write all charts of one country from the shared matrix
+def render_country(spec, dates, c_idx, country, out_path, formats, pop_th=100, num_days=37, max_points=None):
+    '''Render the cumulative, daily, rates & doubling charts of a country.
+        spec:       <tuple> SharedArray spec of the (metric x countries x dates) matrix, metrics are
+                    confirmed cases, deaths & recoveries
+        dates:      <DatetimeIndex> dates of the matrix columns
+        c_idx:      <int> row of the country within the matrix
+        country:    <string> country name
+        out_path:   <string> output path without extension, suffixed by '_<chart>.<format>'
+        formats:    <list> output formats, options are 'html', 'json', 'png' & 'bundle' (the four charts in one
+                    compact file '<out_path>.bundle.json', see covid19_analysis.export)
+        max_points: <int> points budget per curve of the cumulative chart (LTTB decimation), all days by default
+    Returns the build and write times [s]
+        '''
+    data = attach_array(spec)
+    ts_case, ts_death, ts_recov = [pd.Series(np.array(data[m, c_idx]), index=dates) for m in range(3)]
+    df_data = pd.DataFrame({'cases': ts_case, 'death': ts_death, 'recov': ts_recov})
+
+    t0 = time.perf_counter()
+    figs = {
+        'cumulative': figures.cum_jhu(metrics.cum_jhu(ts_case, ts_recov, ts_death, max_points=max_points), country),
+        'daily': figures.daily_cases(metrics.daily_cases(df_data, 'JHU'), country),
+        'rates': figures.country_rates(metrics.country_rates(ts_case, ts_recov, ts_death), country),
+        'doubling': figures.growing_ratio_countries([metrics.doubling_trace(ts_case, country, pop_th)], pop_th, num_days),
+    }
+    t1 = time.perf_counter()
+    for chart, fig in figs.items():
+        write_figure(fig, '%s_%s' % (out_path, chart), [fmt for fmt in formats if fmt != 'bundle'])
+    if 'bundle' in formats:
+        export.to_bundle(figs, out_path + '.bundle.json')
+    return t1 - t0, time.perf_counter() - t1
+
+
+# Write one figure in several formats
+def write_figure(fig, path_base, formats):
+    '''Serialize a figure as <path_base>.<format> for each format ('html', 'json' or 'png', png requires kaleido)'''
+    for fmt in formats:
+        path = '%s.%s' % (path_base, fmt)
+        if fmt == 'html':
+            fig.write_html(path, include_plotlyjs='cdn')
+        elif fmt == 'json':
+            fig.write_json(path)
+        elif fmt == 'png':
+            fig.write_image(path)
+        else:
+            raise ValueError('Unknown output format: %s' % (fmt))
+
+
+# Render all countries charts over a process pool
+def render_countries(data, dates, countries, out_paths, formats, max_workers=None, timeout=None, max_points=None):
+    '''Share the (metric x countries x dates) matrix with the workers and render every country.
+        data:       <array> confirmed, deaths & recovered matrices stacked on the first axis
+        dates:      <DatetimeIndex> dates of the matrix columns
+        countries:  <list> country names, rows of the matrix
+        out_paths:  <list> output path (without extension) per country
+        formats:    <list> output formats
+        max_workers:<int> number of worker processes
+        timeout:    <float> maximum time [s] per country
+        max_points: <int> points budget per curve of the cumulative charts, all days by default
+    Returns RenderResults, results are the (build, write) times per country
+        '''
+    scheduler = RenderScheduler(max_workers=max_workers, timeout=timeout)
+    with SharedArray(data) as shared:
+        tasks = ((c, (shared.spec, dates, c_idx, c, out_paths[c_idx], formats, 100, 37, max_points))
+                 for c_idx, c in enumerate(countries))
+        return scheduler.run(render_country, tasks)
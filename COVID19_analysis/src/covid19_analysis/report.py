@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Batch headless report generator: render the notebooks charts (cumulative, daily,
+rates & doubling-time) for a list of countries from local JHU files.
+
+    covid19-report --data-dir ./jhu --countries France Italy --format html json -w 4
+
+The cases matrix is shared with a pool of worker processes (covid19_analysis.render)
+which compute the metrics, build and write the figures of each country. Timing of
+each stage is printed at the end of the run.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import logging
+
+# import local functions
+import covid19_analysis.loader as loader
+import covid19_analysis.render as render
+from covid19_analysis.store import JHUMetrics
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+FORMATS = ['html', 'png', 'json', 'bundle']
+
+
+# Time spent on each stage of the run
+class StageTimer(object):
+    '''Accumulate wall time per stage, usage: with timer('load'): ...'''
+
+    def __init__(self):
+        self.stages = {}
+        self._current = None
+
+    def __call__(self, stage):
+        self._current = stage
+        return self
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.add(self._current, time.perf_counter() - self._start)
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.) + seconds
+
+    def report(self):
+        '''Return the timing table as text'''
+        lines = ['%-10s %8.3f s' % (stage, seconds) for stage, seconds in self.stages.items()]
+        return '\n'.join(lines)
+
+
+# File name (without extension) of the charts of a country
+def output_path(out_dir, country):
+    return os.path.join(out_dir, re.sub(r'[^\w-]+', '_', country))
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Render COVID-19 charts for a list of countries from local JHU files")
+    parser.add_argument(
+        "--version",
+        action="version",
+        version="COVID19_analysis {ver}".format(ver=__version__))
+    parser.add_argument(
+        "-d",
+        "--data-dir",
+        dest="data_dir",
+        required=True,
+        help="local directory with the JHU time series csv files")
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        dest="output_dir",
+        default="reports",
+        help="directory for the rendered charts (default: reports)")
+    parser.add_argument(
+        "-c",
+        "--countries",
+        dest="countries",
+        nargs="+",
+        help="countries to render, all countries by default")
+    parser.add_argument(
+        "-f",
+        "--format",
+        dest="formats",
+        nargs="+",
+        choices=FORMATS,
+        default=["html"],
+        help="output formats (png requires kaleido), bundle: compact file with the charts of each country")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: number of cpus)")
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        dest="timeout",
+        type=float,
+        help="maximum time in seconds to render one country")
+    parser.add_argument(
+        "--max-points",
+        dest="max_points",
+        type=int,
+        help="maximum number of points per curve of the cumulative charts (LTTB decimation)")
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        help="cache folder for the typed tables")
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        const=logging.INFO)
+    parser.add_argument(
+        "-vv",
+        "--very-verbose",
+        dest="loglevel",
+        help="set loglevel to DEBUG",
+        action="store_const",
+        const=logging.DEBUG)
+    return parser.parse_args(args)
+
+
+def setup_logging(loglevel):
+    """Setup basic logging
+
+    Args:
+      loglevel (int): minimum loglevel for emitting messages
+    """
+    logformat = "[%(asctime)s] %(levelname)s:%(name)s:%(message)s"
+    logging.basicConfig(level=loglevel, stream=sys.stdout,
+                        format=logformat, datefmt="%Y-%m-%d %H:%M:%S")
+
+
+def main(args):
+    """Main entry point allowing external calls
+
+    Args:
+      args ([str]): command line parameter list
+    """
+    args = parse_args(args)
+    setup_logging(args.loglevel)
+    timer = StageTimer()
+
+    with timer('load'):
+        stores = {metric: loader.read_jhu_store(metric, args.data_dir, args.cache_dir) for metric in loader.JHU_FILES}
+    countries = args.countries or list(stores['confirmed'].countries)
+    for country in [c for c in countries if c not in stores['confirmed'].countries]:
+        print('Warning: %s is not a Country/Region of the JHU dataset, skipped' % (country))
+        countries.remove(country)
+    _logger.info("%d countries to render", len(countries))
+
+    # (metric x countries x dates) matrix, aligned on the dates of the three files
+    with timer('align'):
+        aligned = JHUMetrics(stores, countries)
+        data, dates = aligned.data, aligned.dates
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with timer('render'):
+        out_paths = [output_path(args.output_dir, c) for c in countries]
+        res = render.render_countries(data, dates, countries, out_paths, args.formats,
+                                      max_workers=args.workers, timeout=args.timeout, max_points=args.max_points)
+    for t_build, t_write in res.results.values():
+        timer.add('build', t_build)
+        timer.add('write', t_write)
+
+    for country, error in res.failures.items():
+        _logger.error("%s failed:\n%s", country, error)
+
+    # build & write are summed over all workers
+    print("Rendered %d countries into %s, %d failed" % (len(res.results), args.output_dir, len(res.failures)))
+    print(timer.report())
+
+
+def run():
+    """Entry point for console_scripts
+    """
+    main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pandas as pd
+import numpy as np
+
+from covid19_analysis import __version__
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Rules used to build the mainland timeseries of a country (same as dataFun.get_timeseries_from_JHU)
+RULE_SINGLE = 0     # only one Province/State, first row is taken
+RULE_MAINLAND = 1   # several Province/State and one empty, the empty one is the mainland
+RULE_SUM = 2        # several Province/State and none empty, all of them are summed
+
+
+# Date headers of the JHU files (e.g. '3/22/20')
+JHU_DATE_FORMAT = '%m/%d/%y'
+
+
+# Parse the JHU date headers
+def jhu_dates(columns):
+    '''Return the DatetimeIndex of JHU date headers ('m/d/yy')'''
+    return pd.to_datetime(columns, format=JHU_DATE_FORMAT)
+
+
+# Extract the numeric block (dates) of a JHU dataframe, rows in the given order
+def _read_values(df_jhu, order, dtype=np.int64):
+    return np.nan_to_num(df_jhu.iloc[order, 4:].to_numpy(dtype=float)).astype(dtype)
+
+
+# Arrays saved by JHUStore.save, memory-mapped by JHUStore.load
+_SAVED_ARRAYS = ['values', 'provinces_sum', 'mainland', 'total', 'order']
+
+
+# Indexed version of a JHU dataset, parse the wide csv data once and allow fast country lookups
+class JHUStore(object):
+    '''Indexed JHU dataset. The wide dataframe read from the JHU repository is parsed once into
+    a dense (regions x dates) matrix sorted by country, so every country is a contiguous row slice.
+    Country series for mainland, all provinces and 'all' are precomputed on a single pass.
+        df_jhu:     <dataframe> Dataset read from JHU repository (Province/State, Country/Region, Lat, Long, dates...)
+        dtype:      <dtype> counts type of the regions matrix, np.int32 for the compact mode (categorical labels)
+        dates:      <DatetimeIndex> dates index shared with other stores (e.g. deaths & recovered), used when equal
+
+    Memory per region (counts only, 1000 dates): about 8 kB for the JHU dataframe (float64/int64 columns),
+    8 kB for the default store & 4 kB for the compact store (3350 US counties: 27 MB, 27 MB & 13 MB).
+    Country aggregates are int64 in both modes (16 kB per country), results of the store are identical.
+    The source dataframe is not kept, frame rebuilds it from the store when a routine needs it.
+    A saved store (save/load) is memory-mapped from disk, only the rows which are read are loaded.
+    '''
+
+    def __init__(self, df_jhu, dtype=np.int64, dates=None):
+        # no reference to the source dataframe (nor to its blocks), it would double the store memory
+        self._frame = None
+        self._labels = df_jhu.iloc[:, :4].copy()
+        self.dates = self._shared_dates(jhu_dates(df_jhu.columns[4:]), dates)
+        self._index_regions(df_jhu['Country/Region'], df_jhu['Province/State'], compact=np.dtype(dtype) != np.int64)
+        self.values = _read_values(df_jhu, self.order, dtype)
+        self._build_aggregates()
+
+    # Use the shared dates index when it is the same
+    @staticmethod
+    def _shared_dates(dates, shared):
+        if shared is not None and shared.equals(dates):
+            return shared
+        return dates
+
+    # Sort regions by country & index the country slices
+    def _index_regions(self, country, province, compact=False):
+        # sort regions by country (stable, keep the original order within each country)
+        codes, countries = pd.factorize(country, sort=True)
+        order = np.argsort(codes, kind='mergesort')
+        self.countries = pd.Index(countries)
+        self.order = order
+        self.codes = codes[order]
+        self.provinces = np.asarray(province, dtype=object)[order]
+        if compact:
+            self.provinces = pd.Categorical(self.provinces)
+
+        # country -> row slice index
+        n_ctry = len(self.countries)
+        self.starts = np.searchsorted(self.codes, np.arange(n_ctry), side='left')
+        self.stops = np.searchsorted(self.codes, np.arange(n_ctry), side='right')
+        self._index = dict(zip(self.countries, range(n_ctry)))
+
+    # Source dataframe, rebuilt from the store on first use (counts as int, empty cells as 0)
+    @property
+    def frame(self):
+        if self._frame is None:
+            df_jhu = self._labels.copy()
+            df_values = pd.DataFrame(np.asarray(self.values)[np.argsort(self.order)],
+                                     columns=['%d/%d/%s' % (d.month, d.day, d.strftime('%y')) for d in self.dates])
+            self._frame = pd.concat([df_jhu, df_values], axis=1)
+        return self._frame
+
+    @frame.setter
+    def frame(self, df_jhu):
+        self._frame = df_jhu
+
+    # Build the per country aggregates (mainland & all provinces) and the worldwide total
+    def _build_aggregates(self):
+        '''Precompute the (countries x dates) matrices following get_timeseries_from_JHU rules'''
+        self._build_rules()
+        self._update_aggregates(0)
+
+    # Mainland rule & selected row of each country
+    def _build_rules(self):
+        n_ctry = len(self.countries)
+        prov_isna = pd.isna(self.provinces)
+
+        # number of distinct Province/State per country (an empty province counts as one value)
+        pairs = pd.DataFrame({'c': self.codes, 'p': self.provinces}).drop_duplicates()
+        n_prov = np.bincount(pairs['c'].values, minlength=n_ctry)
+        has_nan = np.bincount(self.codes[prov_isna], minlength=n_ctry) > 0
+
+        self.rules = np.full(n_ctry, RULE_SINGLE)
+        self.rules[(n_prov > 1) & has_nan] = RULE_MAINLAND
+        self.rules[(n_prov > 1) & ~has_nan] = RULE_SUM
+
+        # row used for each country when a single row is selected (first one or first empty province)
+        rows = self.starts.copy()
+        nan_rows = np.flatnonzero(prov_isna)
+        nan_ctry, first_nan = np.unique(self.codes[nan_rows], return_index=True)
+        is_mainland = self.rules[nan_ctry] == RULE_MAINLAND
+        rows[nan_ctry[is_mainland]] = nan_rows[first_nan[is_mainland]]
+        self._rows = rows
+
+        # 'US' special case, only states are summed (exclude 'County, State' rows)
+        self._keep = np.ones(self.codes.size, dtype=bool)
+        if 'US' in self._index:
+            us = slice(self.starts[self._index['US']], self.stops[self._index['US']])
+            self._keep[us] = [pd.isna(p) or ', ' not in p for p in self.provinces[us]]
+
+    # Refresh aggregates for dates from column 'col_from' up to the last one
+    def _update_aggregates(self, col_from):
+        '''Compute country aggregates (mainland, provinces & all) for date columns >= col_from'''
+        block = self.values[:, col_from:]
+        provinces = np.add.reduceat(block, self.starts, axis=0, dtype=np.int64)
+        states = np.add.reduceat(block * self._keep[:, None], self.starts, axis=0, dtype=np.int64)
+        mainland = np.where((self.rules == RULE_SUM)[:, None], states, block[self._rows])
+        total = block.sum(axis=0, dtype=np.int64)
+
+        if col_from == 0:
+            self.provinces_sum, self.mainland, self.total = provinces, mainland, total
+        else:
+            self.provinces_sum[:, col_from:] = provinces
+            self.mainland[:, col_from:] = mainland
+            self.total[col_from:] = total
+
+    # Incremental update from a newer version of the JHU dataset
+    def refresh(self, df_jhu, dates=None):
+        '''Update the store with a newer JHU dataframe. Only new date columns are appended and corrected
+        historical cells are patched, aggregates are recomputed from the first modified date only.
+        The store is rebuilt when the regions list changed or the dates are not an extension of the current ones.
+            df_jhu:     <dataframe> newer version of the dataset read from JHU repository
+            dates:      <DatetimeIndex> refreshed dates index of the sibling stores (other metrics), used when
+                        equal, the current dates index is kept otherwise when unchanged
+        Returns the index of the first modified date column (len(store.dates) if nothing changed)
+        '''
+        # sibling dates first, then the current ones
+        dates = self._shared_dates(self._shared_dates(jhu_dates(df_jhu.columns[4:]), self.dates), dates)
+        n_old = self.dates.size
+        same_regions = all(pd.Series(df_jhu[c].values, dtype=object).equals(pd.Series(self._labels[c].values, dtype=object))
+                           for c in ['Country/Region', 'Province/State'])
+        if not same_regions or dates.size < n_old or not dates[:n_old].equals(self.dates):
+            self.__init__(df_jhu, self.values.dtype, dates=dates)
+            return 0
+
+        # patch corrected historical cells
+        values = _read_values(df_jhu, self.order, self.values.dtype)
+        changed = values[:, :n_old] != self.values
+        changed_cols = np.flatnonzero(changed.any(axis=0))
+        self.values[changed] = values[:, :n_old][changed]
+
+        # append new dates
+        n_new = dates.size - n_old
+        if n_new:
+            self.values = np.concatenate([self.values, values[:, n_old:]], axis=1)
+            self.provinces_sum = np.concatenate([self.provinces_sum, np.zeros((len(self.countries), n_new), dtype=np.int64)], axis=1)
+            self.mainland = np.concatenate([self.mainland, np.zeros((len(self.countries), n_new), dtype=np.int64)], axis=1)
+            self.total = np.concatenate([self.total, np.zeros(n_new, dtype=np.int64)])
+        self._frame = None
+        self._labels = df_jhu.iloc[:, :4].copy()
+        self.dates = dates
+
+        col_from = changed_cols[0] if changed_cols.size else n_old
+        if col_from < self.dates.size:
+            self._update_aggregates(col_from)
+        return col_from
+
+    # Get the position of a country within the index
+    def country_index(self, country_name):
+        '''Return the position of the country in the store, raise KeyError if unknown'''
+        try:
+            return self._index[country_name]
+        except KeyError:
+            raise KeyError('%s is not a Country/Region of the JHU dataset' % (country_name))
+
+    # Get the rows slice of a country
+    def country_slice(self, country_name):
+        '''Return the slice of rows (regions) belonging to a country within store.values'''
+        cidx = self.country_index(country_name)
+        return slice(self.starts[cidx], self.stops[cidx])
+
+    # Provide a timeseries for a define country (same rules as dataFun.get_timeseries_from_JHU)
+    def get_timeseries(self, country_name, mainland=True, verbose=True):
+        '''Provide a timeseries for a define country.
+            country_name:   <string> Name of the country within the JHU country list, or 'all'
+            mainland:       <boolean> Allows to choose between have only mainland data or all places data, True by default
+            verbose:        <boolean> Display message for the user from data extraction
+            '''
+        if country_name == 'all':
+            data = self.total
+        else:
+            cidx = self.country_index(country_name)
+            if mainland:
+                if verbose and self.rules[cidx] != RULE_SINGLE:
+                    print('Warning: %s has several Province/State' % (country_name))
+                    if self.rules[cidx] == RULE_MAINLAND:
+                        print('Warning: Only mainland was taken for %s' % (country_name))
+                    else:
+                        print('Warning: data for %s is the sum of all Provice/State' % (country_name))
+                data = self.mainland[cidx]
+            else:
+                data = self.provinces_sum[cidx]
+
+        return pd.Series(data=data, index=self.dates, dtype=int, copy=True)
+
+    # Country timeseries matrix following another countries & dates axis
+    def reindex(self, countries, dates=None, mainland=True):
+        '''Return a (countries x dates) matrix, zero for countries or dates missing in the store
+            countries:  <list> Country/Region names of the output rows
+            dates:      <DatetimeIndex> dates of the output columns, store dates by default
+            mainland:   <boolean> mainland rules (True) or sum of all Province/State (False)
+            '''
+        data = self.mainland if mainland else self.provinces_sum
+        ridx = self.countries.get_indexer(countries)
+        cidx = np.arange(self.dates.size) if dates is None else self.dates.get_indexer(dates)
+        out = data[ridx][:, cidx]
+        out[ridx < 0] = 0
+        out[:, cidx < 0] = 0
+        return out
+
+    # Provide all countries timeseries as a single dataframe
+    def to_frame(self, mainland=True):
+        '''Return a (countries x dates) dataframe, one row per Country/Region
+            mainland:   <boolean> mainland rules (True) or sum of all Province/State (False)
+            '''
+        data = self.mainland if mainland else self.provinces_sum
+        return pd.DataFrame(data=data, index=pd.Index(self.countries, name='Country/Region'), columns=self.dates)
+
+    # Size of the store arrays
+    @property
+    def nbytes(self):
+        '''Memory used by the counts matrix and the country aggregates [bytes]'''
+        return sum(getattr(self, name).nbytes for name in _SAVED_ARRAYS)
+
+    # Write the store arrays as .npy files
+    def save(self, path):
+        '''Save the store into the folder path (one .npy file per array, regions labels as csv), see JHUStore.load'''
+        os.makedirs(path, exist_ok=True)
+        for name in _SAVED_ARRAYS:
+            np.save(os.path.join(path, name + '.npy'), np.asarray(getattr(self, name)))
+        np.save(os.path.join(path, 'dates.npy'), self.dates.values)
+        self._labels.to_csv(os.path.join(path, 'regions.csv'), index=False)
+
+    # Open a saved store, arrays are memory-mapped
+    @classmethod
+    def load(cls, path, mmap_mode='r', dates=None):
+        '''Open a store written by JHUStore.save without reading the regions counts, they are mapped from disk.
+            path:       <string> store folder
+            mmap_mode:  <string> numpy memory-map mode, 'r' (read-only) by default, 'c' allows refresh (copy on write)
+            dates:      <DatetimeIndex> dates index shared with other stores, used when equal
+            '''
+        store = cls.__new__(cls)
+        # only the regions matrix is mapped, aggregates are small
+        arrays = dict((name, np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode if name == 'values' else None))
+                      for name in _SAVED_ARRAYS)
+        df_labels = pd.read_csv(os.path.join(path, 'regions.csv'), dtype={'Province/State': object, 'Country/Region': object})
+
+        store._frame = None
+        store._labels = df_labels
+        store.dates = cls._shared_dates(pd.DatetimeIndex(np.load(os.path.join(path, 'dates.npy'))), dates)
+        store._index_regions(df_labels['Country/Region'], df_labels['Province/State'],
+                             compact=arrays['values'].dtype != np.int64)
+        store._build_rules()
+        for name, data in arrays.items():
+            setattr(store, name, data)
+        return store
+
+
+# Partitioned version of the SPF key figures, one contiguous block of rows per (granularite, maille_code)
+class SPFStore(object):
+    '''Indexed SPF (opencovid19-fr chiffres-cles) dataset. Rows are sorted once by granularity, area code & date,
+    so the data of a country, region or department is a row slice found without scanning the table.
+        df_spf:     <dataframe> chiffres-cles table (date, granularite, maille_code, maille_nom, source_nom, counts...)
+    '''
+
+    def __init__(self, df_spf):
+        keys = ['granularite', 'maille_code', 'date']
+        self.frame = df_spf.sort_values(keys, kind='mergesort').reset_index(drop=True)
+
+        # partition boundaries
+        gran = self.frame['granularite'].astype(str).values
+        code = self.frame['maille_code'].astype(str).values
+        new_part = np.ones(len(self.frame), dtype=bool)
+        new_part[1:] = (gran[1:] != gran[:-1]) | (code[1:] != code[:-1])
+        starts = np.flatnonzero(new_part)
+        stops = np.append(starts[1:], len(self.frame))
+
+        self.partitions = dict(((gran[i], code[i]), (i, j)) for i, j in zip(starts, stops))
+
+        # area name -> partition keys (a name can exist at several granularities, e.g. Mayotte)
+        self._names = {}
+        names = self.frame['maille_nom'].astype(str).values
+        for i in starts:
+            self._names.setdefault(names[i], []).append((gran[i], code[i]))
+
+    # Partition key of an area
+    def key(self, maille, granularite=None):
+        '''Return the (granularite, maille_code) of an area given by name or code, raise KeyError if unknown'''
+        candidates = [k for k in self._names.get(maille, []) if granularite in (None, k[0])]
+        candidates += [k for k in self.partitions if k[1] == maille and granularite in (None, k[0])]
+        if not candidates:
+            raise KeyError('%s is not a maille_nom or maille_code of the SPF dataset' % (maille))
+        if len(set(candidates)) > 1:
+            print('Warning: %s found for several granularities, %s taken' % (maille, candidates[0][0]))
+        return candidates[0]
+
+    # Rows of one area
+    def get(self, maille, granularite=None, source=None):
+        '''Provide the rows of an area sorted by date, ready for dataPlot.disp_cumulative & disp_daily_cases
+            maille:         <string> maille_nom (e.g. 'Savoie') or maille_code (e.g. 'DEP-73')
+            granularite:    <string> 'pays', 'region', 'departement'... needed only for names shared by several levels
+            source:         <string> keep only the rows of this source_nom, all sources by default
+            '''
+        start, stop = self.partitions[self.key(maille, granularite)]
+        df_area = self.frame.iloc[start:stop]
+        if source is not None:
+            df_area = df_area.loc[df_area['source_nom'] == source]
+        return df_area
+
+    # Area names of a granularity
+    def names(self, granularite):
+        '''Return the list of maille_nom of a granularity'''
+        return [name for name, keys in self._names.items() if any(k[0] == granularite for k in keys)]
+
+
+# Hierarchical version of the JHU US counties dataset (country -> state -> county)
+class USStore(object):
+    '''Indexed JHU US file (time_series_covid19_confirmed_US.csv or deaths). Counties are sorted by state then FIPS
+    so each state is a contiguous row slice, state & country rollups are precomputed with one segment sum.
+    Every series is a row of a precomputed matrix: country ('US'), state name, county FIPS or Combined_Key.
+        df_us:      <dataframe> Dataset read from JHU repository (UID, iso2, iso3, code3, FIPS, Admin2, Province_State,
+                    Country_Region, Lat, Long_, Combined_Key, [Population], dates...)
+        dtype:      <dtype> counts type of the counties matrix, np.int32 for a compact store
+    '''
+
+    def __init__(self, df_us, dtype=np.int64):
+        first_date = df_us.columns.get_loc('Combined_Key') + 1
+        if 'Population' in df_us.columns:   # deaths file
+            first_date = df_us.columns.get_loc('Population') + 1
+        self.dates = jhu_dates(df_us.columns[first_date:])
+
+        # sort counties by state then FIPS (rows without FIPS last within their state)
+        state_codes, states = pd.factorize(df_us['Province_State'], sort=True)
+        fips = df_us['FIPS'].to_numpy(dtype=float)
+        order = np.lexsort((np.nan_to_num(fips, nan=np.inf), state_codes))
+        self.states = pd.Index(states)
+        self.order = order
+        self.state_codes = state_codes[order]
+        self.fips = fips[order]
+        self.counties = df_us[['FIPS', 'Admin2', 'Province_State', 'Combined_Key']].iloc[order].reset_index(drop=True)
+        self.population = df_us['Population'].to_numpy()[order] if 'Population' in df_us.columns else None
+        self.values = np.nan_to_num(df_us.iloc[order, first_date:].to_numpy(dtype=float)).astype(dtype)
+
+        # state -> counties rows slice
+        n_states = len(self.states)
+        self.starts = np.searchsorted(self.state_codes, np.arange(n_states), side='left')
+        self.stops = np.searchsorted(self.state_codes, np.arange(n_states), side='right')
+
+        # rollups (one pass over the counties matrix)
+        self.state_values = np.add.reduceat(self.values, self.starts, axis=0, dtype=np.int64)
+        self.total = self.state_values.sum(axis=0)
+
+        # key -> (matrix, row)
+        self._index = {'US': (None, 0)}
+        self._index.update((s, ('state', i)) for i, s in enumerate(self.states))
+        self._index.update((k, ('county', i)) for i, k in enumerate(self.counties['Combined_Key']))
+        self._index.update((int(f), ('county', i)) for i, f in enumerate(self.fips) if not np.isnan(f))
+
+    # Position of a series
+    def locate(self, key):
+        '''Return the (level, row) of a key: 'US', a state name, a county FIPS code or Combined_Key,
+        level is None for the country, 'state' or 'county'. Raise KeyError if unknown'''
+        try:
+            return self._index[key]
+        except (KeyError, TypeError):
+            raise KeyError('%s is not a state, FIPS code or Combined_Key of the JHU US dataset' % (key))
+
+    # Counties rows of a state
+    def state_slice(self, state):
+        '''Return the slice of counties (rows of store.values & store.counties) of a state'''
+        level, idx = self.locate(state)
+        if level != 'state':
+            raise KeyError('%s is not a state of the JHU US dataset' % (state))
+        return slice(self.starts[idx], self.stops[idx])
+
+    # Timeseries of the country, a state or a county
+    def get_timeseries(self, key):
+        '''Provide the timeseries of 'US', a state (e.g. 'New York') or a county (FIPS code, e.g. 36061,
+        or Combined_Key, e.g. 'New York, New York, US')'''
+        level, idx = self.locate(key)
+        if level is None:
+            data = self.total
+        elif level == 'state':
+            data = self.state_values[idx]
+        else:
+            data = self.values[idx]
+        return pd.Series(data=data, index=self.dates, dtype=int, copy=True)
+
+    # States or counties timeseries as a single dataframe
+    def to_frame(self, level='state'):
+        '''Return a (states x dates) or (counties x dates) dataframe, counties indexed by Combined_Key
+            level:      <string> 'state' or 'county'
+            '''
+        if level == 'state':
+            return pd.DataFrame(data=self.state_values, index=pd.Index(self.states, name='Province_State'),
+                                columns=self.dates)
+        return pd.DataFrame(data=self.values, index=pd.Index(self.counties['Combined_Key'], name='Combined_Key'),
+                            columns=self.dates)
+
+
+# Cases, deaths & recoveries of the JHU countries aligned in a single array
+class JHUMetrics(object):
+    '''Stack the confirmed, deaths & recovered JHU datasets into one read-only (metric x country x date) array.
+    Dates are the union of the datasets dates, a date missing in one dataset is forward filled (cumulative
+    counts), zero before its first date. Countries missing in one dataset are zero for that metric.
+        stores:     <dict> {'confirmed', 'deaths', 'recovered'} JHUStore or JHU dataframes
+        countries:  <list> Country/Region names of the rows, confirmed countries (then the others) by default
+        mainland:   <boolean> mainland rules (True) or sum of all Province/State (False), see get_timeseries_from_JHU
+    Per-country frames (frame) & series (series) are views on the array, nothing is copied.
+    '''
+
+    metrics = ['confirmed', 'deaths', 'recovered']
+    columns = ['cases', 'death', 'recov']    # dataPlot.disp_daily_cases JHU layout
+
+    def __init__(self, stores, countries=None, mainland=True):
+        stores = [s if isinstance(s, JHUStore) else JHUStore(s) for s in (stores[m] for m in self.metrics)]
+        if countries is None:
+            countries = pd.Index(stores[0].countries)
+            for store in stores[1:]:
+                countries = countries.append(store.countries.difference(countries))
+        self.countries = pd.Index(countries)
+        self.dates = stores[0].dates
+        for store in stores[1:]:
+            if not store.dates.equals(self.dates):
+                self.dates = self.dates.union(store.dates)
+
+        data = np.zeros((len(stores), len(self.countries), self.dates.size), dtype=np.int64)
+        for m, store in enumerate(stores):
+            cidx = store.dates.get_indexer(self.dates)
+            # forward fill: missing dates take the last known date of the store
+            last = np.maximum.accumulate(np.where(cidx >= 0, cidx, -1))
+            data[m] = store.reindex(self.countries, store.dates, mainland)[:, np.maximum(last, 0)]
+            data[m][:, last < 0] = 0
+        data.setflags(write=False)
+        self.data = data
+        self._position = dict(zip(self.countries, range(len(self.countries))))
+
+    def _row(self, country):
+        try:
+            return self._position[country]
+        except KeyError:
+            raise KeyError('%s is not a Country/Region of the aligned datasets' % (country))
+
+    # Multi-metric frame of a country
+    def frame(self, country):
+        '''Return the (dates x [cases, death, recov]) dataframe of a country, a view on the array.
+        The columns name is the country, the frame is ready for dataPlot.disp_cum_jhu, disp_country_rates_jhu
+        & disp_daily_cases(df_source='JHU')'''
+        df = pd.DataFrame(self.data[:, self._row(country), :].T, index=self.dates,
+                          columns=pd.Index(self.columns, name=country), copy=False)
+        return df
+
+    # Timeseries of the three metrics of a country
+    def series(self, country):
+        '''Return the (ts_case, ts_recov, ts_death) series of a country, views on the array'''
+        c_idx = self._row(country)
+        return tuple(pd.Series(self.data[m, c_idx], index=self.dates, name=self.columns[m], copy=False) for m in (0, 2, 1))
@@ -1,10 +1,119 @@
 # -*- coding: utf-8 -*-
 """
-    Dummy conftest.py for covid19_analysis.
+    conftest.py for covid19_analysis.
 
-    If you don't know what this is for, just leave it empty.
-    Read more about conftest.py under:
-    https://pytest.org/latest/plugins.html
+    Synthetic datasets shaped like the JHU & SPF repository files, shared by the tests.
 """
 
-# import pytest
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# Build a JHU shaped wide dataframe (Province/State, Country/Region, Lat, Long, dates...) from its counts
+def jhu_frame(regions, values, rng):
+    '''Wide dataframe of the (Province/State, Country/Region) regions, values are the (regions x dates) counts
+    from 2020-01-22, rng draws the coordinates (also used by the benchmarks datasets)'''
+    dates = pd.date_range('2020-01-22', periods=values.shape[1])
+    df = pd.DataFrame(values, columns=['%d/%d/%s' % (d.month, d.day, d.strftime('%y')) for d in dates])
+    df.insert(0, 'Long', rng.uniform(-180, 180, len(regions)))
+    df.insert(0, 'Lat', rng.uniform(-90, 90, len(regions)))
+    df.insert(0, 'Country/Region', [r[1] for r in regions])
+    df.insert(0, 'Province/State', [r[0] for r in regions])
+    return df
+
+
+# Synthetic JHU dataset
+def make_jhu_frame(n_dates=30, seed=0):
+    '''Synthetic JHU dataset covering every country rule: single row, mainland + overseas,
+    provinces only, 'US' states with counties and empty cells'''
+    rng = np.random.RandomState(seed)
+    regions = [
+        (np.nan, 'France'), ('Guadeloupe', 'France'), ('Reunion', 'France'),
+        (np.nan, 'Italy'),
+        ('Hubei', 'China'), ('Beijing', 'China'), ('Shanghai', 'China'),
+        ('New York', 'US'), ('Washington', 'US'), ('King County, WA', 'US'), ('Texas', 'US'),
+        ('New South Wales', 'Australia'), ('Victoria', 'Australia'),
+        ('Ontario', 'Canada'), (np.nan, 'Canada'), ('Quebec', 'Canada'),
+        (np.nan, 'Brazil'),
+        (np.nan, 'Zimbabwe'),
+    ]
+    regions = [regions[i] for i in rng.permutation(len(regions))]
+
+    values = np.cumsum(rng.randint(0, 50, size=(len(regions), n_dates)), axis=1).astype(float)
+    values[0, 3] = np.nan
+    return jhu_frame(regions, values, rng)
+
+
+# Build a SPF chiffres-cles shaped dataframe (several granularities & sources per area, shuffled rows)
+def make_spf_frame(n_dates=20, seed=0):
+    '''Synthetic SPF dataset: France, two regions and three departments (Mayotte at both levels),
+    reported by one to three sources, with empty cells and a malformed date'''
+    rng = np.random.RandomState(seed)
+    areas = [
+        ('pays', 'FRA', 'France', ['Ministère des Solidarités et de la Santé', 'OpenCOVID19-fr']),
+        ('region', 'REG-84', 'Auvergne-Rhône-Alpes', ['ARS Auvergne-Rhône-Alpes', 'Santé publique France', 'OpenCOVID19-fr']),
+        ('region', 'REG-06', 'Mayotte', ['Santé publique France']),
+        ('departement', 'DEP-73', 'Savoie', ['ARS Auvergne-Rhône-Alpes', 'Santé publique France']),
+        ('departement', 'DEP-69', 'Rhône', ['ARS Auvergne-Rhône-Alpes']),
+        ('departement', 'DEP-976', 'Mayotte', ['Santé publique France']),
+    ]
+    dates = pd.date_range('2020-03-01', periods=n_dates).strftime('%Y-%m-%d')
+    rows = []
+    for gran, code, name, sources in areas:
+        cases = np.cumsum(rng.randint(0, 100, n_dates))
+        for s_idx, source in enumerate(sources):
+            for d_idx, date in enumerate(dates):
+                rows.append((date, gran, code, name, source, 'type', cases[d_idx] + s_idx, cases[d_idx] // 20, s_idx))
+    df = pd.DataFrame(rows, columns=['date', 'granularite', 'maille_code', 'maille_nom', 'source_nom', 'source_type',
+                                     'cas_confirmes', 'deces', 'gueris'])
+    df['deces'] = df['deces'].astype(float)
+    df.loc[rng.rand(len(df)) < .1, 'deces'] = np.nan
+    df.loc[3, 'date'] = '2020-03-xx'
+    return df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+
+# Build a JHU US shaped wide dataframe (UID, iso2, ..., Combined_Key, [Population], dates...)
+def make_us_frame(n_dates=30, seed=0, population=False):
+    '''Synthetic JHU US dataset: counties of three states, 'Unassigned' & 'Out of' rows,
+    a territory and a cruise ship without FIPS, shuffled rows'''
+    rng = np.random.RandomState(seed)
+    counties = [
+        (36061., 'New York', 'New York'), (36047., 'Kings', 'New York'), (80036., 'Out of NY', 'New York'),
+        (90036., 'Unassigned', 'New York'),
+        (53033., 'King', 'Washington'), (53061., 'Snohomish', 'Washington'),
+        (1001., 'Autauga', 'Alabama'), (1003., 'Baldwin', 'Alabama'),
+        (72., np.nan, 'Puerto Rico'),
+        (np.nan, np.nan, 'Diamond Princess'),
+    ]
+    counties = [counties[i] for i in rng.permutation(len(counties))]
+
+    dates = pd.date_range('2020-01-22', periods=n_dates)
+    values = np.cumsum(rng.randint(0, 50, size=(len(counties), n_dates)), axis=1)
+
+    df = pd.DataFrame(values, columns=['%d/%d/%s' % (d.month, d.day, d.strftime('%y')) for d in dates])
+    keys = [', '.join([x for x in (c[1], c[2]) if isinstance(x, str)] + ['US']) for c in counties]
+    labels = pd.DataFrame({
+        'UID': [84000000 + (0 if np.isnan(c[0]) else int(c[0])) for c in counties], 'iso2': 'US', 'iso3': 'USA',
+        'code3': 840, 'FIPS': [c[0] for c in counties], 'Admin2': [c[1] for c in counties],
+        'Province_State': [c[2] for c in counties], 'Country_Region': 'US',
+        'Lat': rng.uniform(20, 50, len(counties)), 'Long_': rng.uniform(-160, -70, len(counties)),
+        'Combined_Key': keys})
+    if population:
+        labels['Population'] = rng.randint(0, 10 ** 6, len(counties))
+    return pd.concat([labels, df], axis=1)
+
+
+@pytest.fixture
+def df_jhu():
+    return make_jhu_frame()
+
+
+@pytest.fixture
+def df_spf():
+    return make_spf_frame()
+
+
+@pytest.fixture
+def df_us():
+    return make_us_frame()
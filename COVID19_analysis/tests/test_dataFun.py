@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from covid19_analysis import dataFun
+from covid19_analysis.store import JHUStore, USStore, jhu_dates
+
+from conftest import make_us_frame
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+@pytest.mark.parametrize('mainland', [True, False])
+def test_store_timeseries(df_jhu, mainland):
+    store = JHUStore(df_jhu)
+    for country in list(df_jhu['Country/Region'].unique()) + ['all']:
+        expected = dataFun.get_timeseries_from_JHU(df_jhu, country, mainland, verbose=False)
+        result = dataFun.get_timeseries_from_JHU(store, country, mainland, verbose=False)
+        pd.testing.assert_series_equal(result, expected)
+
+
+def test_store_unknown_country(df_jhu):
+    with pytest.raises(KeyError):
+        JHUStore(df_jhu).get_timeseries('Atlantis')
+
+
+@pytest.mark.parametrize('mainland', [True, False])
+def test_aggregate_all_countries(df_jhu, mainland):
+    df_all = dataFun.aggregate_all_countries(df_jhu, mainland=mainland)
+    assert sorted(df_all.index) == sorted(df_jhu['Country/Region'].unique())
+    for country in df_all.index:
+        expected = dataFun.get_timeseries_from_JHU(df_jhu, country, mainland, verbose=False)
+        pd.testing.assert_series_equal(df_all.loc[country], expected, check_names=False)
+
+
+def test_aggregate_all_countries_rules(df_jhu):
+    df_all = dataFun.aggregate_all_countries(df_jhu)
+    df_sum = dataFun.aggregate_all_countries(df_jhu, mainland=False)
+    dates = df_jhu.columns[4:]
+
+    # mainland is the empty Province/State row
+    france = df_jhu.loc[(df_jhu['Country/Region'] == 'France') & df_jhu['Province/State'].isna(), dates]
+    assert (df_all.loc['France'].values == france.fillna(0).values[0]).all()
+    assert (df_sum.loc['France'] >= df_all.loc['France']).all()
+
+    # 'US' sum excludes counties
+    us = df_jhu.loc[(df_jhu['Country/Region'] == 'US') & ~df_jhu['Province/State'].str.contains(', '), dates]
+    assert (df_all.loc['US'].values == us.fillna(0).sum().values).all()
+
+
+@pytest.mark.parametrize('num_days', [5, 12, 100])
+def test_last_daily_matrix(df_jhu, num_days):
+    ctry_list = ['France', 'US', 'China', 'all']
+    data, dates = dataFun.get_countries_matrix(df_jhu, ctry_list)
+    res = dataFun.last_daily_matrix(data, dates, num_days=num_days)
+
+    for c_idx, c in enumerate(ctry_list):
+        # per country computation as done by dataPlot.last_daily_cases
+        ts_c = dataFun.get_timeseries_from_JHU(df_jhu, c, verbose=False)
+        ts_c_daily = pd.Series(ts_c.values[1:] - ts_c.values[:-1], index=ts_c.index[1:]).clip(0)
+        ts_c_roll = ts_c_daily.rolling(7, min_periods=1, center=True).sum()
+        mask = ts_c_daily.index >= (ts_c_daily.index[-1] - pd.Timedelta(num_days, unit='days'))
+
+        assert res.dates.equals(ts_c_daily.index[mask])
+        assert (res.daily[c_idx] == ts_c_daily[mask].values).all()
+        assert (res.rolling[c_idx] == ts_c_roll[mask].values).all()
+
+
+def test_estimate_doubling_time():
+    # exact exponential growth, doubling every 3 days, with a downward correction
+    data = np.ceil(100 * 2 ** (np.arange(30) / 3.))
+    data = np.vstack([data, np.r_[np.zeros(10), data[:20]]])
+    data[0, 20] = data[0, 19] - 5
+    res = dataFun.estimate_doubling_time(data, window=7)
+
+    assert np.allclose(res.doubling[0, 6:19], 3, rtol=1e-2)
+    assert res.lower[0, 10] <= res.doubling[0, 10] <= res.upper[0, 10]
+    assert np.isnan(res.doubling[1, :11]).all()     # not enough days with cases
+
+    # same fit as numpy polyfit on one window
+    window = np.log(data[0, 3:10])
+    assert np.isclose(res.slope[0, 9], np.polyfit(np.arange(7), window, 1)[0])
+
+
+def test_reshape_jhu(df_jhu):
+    store = JHUStore(df_jhu)
+    df_view = dataFun.reshape_jhu(store)
+    assert np.shares_memory(df_view.values, store.values)
+    assert df_view.shape == (store.dates.size, len(df_jhu))
+    assert 'France' in df_view.columns and 'France - Guadeloupe' in df_view.columns
+    assert not np.shares_memory(dataFun.reshape_jhu(store, copy=True).values, store.values)
+
+    df_long = dataFun.reshape_jhu(df_jhu, long_format=True)
+    assert len(df_long) == df_jhu.shape[0] * (df_jhu.shape[1] - 4)
+    ts_long = df_long.loc[df_long.Region == 'China - Hubei'].set_index('Date')['value']
+    assert (ts_long == df_view['China - Hubei']).all()
+
+    df_new = dataFun.recreate_df(df_jhu)
+    assert list(df_new.columns[1:]) == list(dataFun.reshape_jhu(df_jhu).columns)
+    assert (df_new['Italy'].values == np.nan_to_num(df_jhu.loc[df_jhu['Country/Region'] == 'Italy'].values[0, 4:].astype(float))).all()
+
+
+def test_compact_store(df_jhu, tmp_path):
+    store = JHUStore(df_jhu)
+    compact = JHUStore(df_jhu, dtype=np.int32, dates=store.dates)
+    assert compact.values.dtype == np.int32 and compact.dates is store.dates
+    assert compact.nbytes < store.nbytes
+
+    compact.save(str(tmp_path))
+    loaded = JHUStore.load(str(tmp_path), dates=store.dates)
+    assert isinstance(loaded.values, np.memmap) and loaded.dates is store.dates
+
+    for mainland in [True, False]:
+        for country in list(df_jhu['Country/Region'].unique()) + ['all']:
+            expected = dataFun.get_timeseries_from_JHU(df_jhu, country, mainland, verbose=False)
+            for st in [compact, loaded]:
+                pd.testing.assert_series_equal(dataFun.get_timeseries_from_JHU(st, country, mainland, verbose=False),
+                                               expected)
+        assert np.array_equal(loaded.to_frame(mainland).values, dataFun.aggregate_all_countries(df_jhu, mainland).values)
+
+    pd.testing.assert_frame_equal(dataFun.reshape_jhu(loaded), dataFun.reshape_jhu(store), check_dtype=False)
+    assert loaded.frame.shape == df_jhu.shape
+
+
+def test_us_store(df_us):
+    store = USStore(df_us)
+    dates = jhu_dates(df_us.columns[11:])
+
+    # states are contiguous slices, rollups match the counties sums
+    for state, df_state in df_us.groupby('Province_State'):
+        rows = store.state_slice(state)
+        assert sorted(store.counties['Combined_Key'][rows]) == sorted(df_state['Combined_Key'])
+        np.testing.assert_array_equal(store.get_timeseries(state).values, df_state.iloc[:, 11:].sum().values)
+    np.testing.assert_array_equal(dataFun.get_timeseries_from_JHU(store, 'US').values, df_us.iloc[:, 11:].sum().values)
+
+    # counties by FIPS or Combined_Key
+    row = df_us.loc[df_us['FIPS'] == 53033].iloc[0]
+    ts = store.get_timeseries(53033)
+    assert ts.index.equals(dates)
+    np.testing.assert_array_equal(ts.values, row.iloc[11:].values.astype(int))
+    assert ts.equals(store.get_timeseries('King, Washington, US'))
+    assert store.get_timeseries('Diamond Princess, US').equals(store.get_timeseries('Diamond Princess'))
+    with pytest.raises(KeyError):
+        store.get_timeseries(99999)
+    with pytest.raises(KeyError):
+        store.state_slice(53033)
+
+    # deaths file layout (Population column), compact counts
+    df_deaths = make_us_frame(population=True)
+    compact = USStore(df_deaths, dtype=np.int32)
+    assert compact.values.dtype == np.int32 and compact.dates.equals(dates)
+    np.testing.assert_array_equal(compact.total, store.total)
+    assert compact.population.sum() == df_deaths['Population'].sum()
+
+
+def test_align_days(df_jhu):
+    store = JHUStore(df_jhu)
+    data, dates = store.mainland, store.dates
+    data = np.vstack([data, np.zeros((1, dates.size), dtype=int)])   # never above the threshold
+
+    res = dataFun.align_days(data, dates, 150)
+    assert res.data.shape == (len(data), res.length.max())
+    assert res.start[-1] == -1 and res.length[-1] == 0 and np.isnan(res.data[-1]).all()
+    for r_idx, row in enumerate(data[:-1]):
+        start, n = res.start[r_idx], res.length[r_idx]
+        assert row[start] > 150 and (row[:start] <= 150).all()
+        np.testing.assert_array_equal(res.data[r_idx, :n], row[start:])
+        assert np.isnan(res.data[r_idx, n:]).all()
+
+    # one baseline per region, counts from the baseline day
+    baseline = dates[[5, 10] * (len(data) // 2) + [5] * (len(data) % 2)]
+    res = dataFun.align_days(data, dates, 20, baseline, clear_pop=True)
+    base = dates.searchsorted(baseline)
+    for r_idx, row in enumerate(data):
+        rebased = row[base[r_idx]:] - row[base[r_idx]]
+        above = np.flatnonzero(rebased > 20)
+        if above.size:
+            assert res.start[r_idx] == base[r_idx] + above[0]
+            np.testing.assert_array_equal(res.data[r_idx, :res.length[r_idx]], rebased[above[0]:])
+        else:
+            assert res.start[r_idx] == -1
+
+
+# Reference LTTB, one series & one bucket at a time
+def lttb_reference(y, max_points):
+    n = len(y)
+    every = (n - 2) / (max_points - 2)
+    index, a = [0], 0
+    for b in range(max_points - 2):
+        b0, b1 = int(b * every) + 1, int((b + 1) * every) + 1
+        c1 = min(int((b + 2) * every) + 1, n)
+        cx, cy = np.mean(np.arange(b1, c1)), np.mean(y[b1:c1])
+        areas = [abs((a - cx) * (y[i] - y[a]) - (a - i) * (cy - y[a])) for i in range(b0, b1)]
+        a = b0 + int(np.argmax(areas))
+        index.append(a)
+    return index + [n - 1]
+
+
+@pytest.mark.parametrize('max_points', [3, 10, 23])
+def test_decimate(max_points):
+    rng = np.random.RandomState(1)
+    data = np.cumsum(rng.randint(-20, 50, size=(6, 100)), axis=1)
+
+    index = dataFun.decimate(data, max_points)
+    assert index.shape == (6, max_points)
+    for row, idx in zip(data, index):
+        assert list(idx) == lttb_reference(row.astype(float), max_points)
+
+    index = dataFun.decimate(data, 2 * (max_points // 2), 'minmax')
+    assert (np.diff(index, axis=1) >= 0).all()
+    for row, idx in zip(data, index):
+        assert row.argmax() in idx and row.argmin() in idx
+
+    assert (dataFun.decimate(data[:, :max_points], max_points) == np.arange(max_points)).all()
+    with pytest.raises(ValueError):
+        dataFun.decimate(data, max_points, 'mean')
+
+
+@pytest.mark.parametrize('max_points,method', [(2, 'lttb'), (0, 'lttb'), (1, 'minmax')])
+def test_decimate_budget(max_points, method):
+    data = np.arange(40).reshape(2, 20)
+    with pytest.raises(ValueError):
+        dataFun.decimate(data, max_points, method)
+    assert dataFun.decimate(data, 2, 'minmax').tolist() == [[0, 19], [0, 19]]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import numpy as np
+import pytest
+
+from covid19_analysis import dataFun, metrics, figures, export
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+pytest.importorskip('plotly')
+
+
+def test_bundle(df_jhu, tmp_path):
+    figs = {}
+    for c in ['France', 'Italy']:
+        ts_case = dataFun.get_timeseries_from_JHU(df_jhu, c, verbose=False)
+        figs[c] = figures.cum_jhu(metrics.cum_jhu(ts_case, ts_case // 2, ts_case // 10), c)
+        figs[c + ' rates'] = figures.country_rates(metrics.country_rates(ts_case, ts_case // 2, ts_case // 10), c)
+    figs['comparison'] = figures.countries_comp(metrics.countries_comp(df_jhu, ['France', 'China'], max_points=8))
+
+    path = str(tmp_path / 'dashboard.json')
+    text = export.to_bundle(figs, path)
+    bundle = json.loads(text)
+    # one date axis & one template for the whole dashboard
+    assert list(bundle['axes']) == ['a0'] and list(bundle['templates']) == ['t0']
+    trace = bundle['figures']['France']['data'][0]
+    assert trace['x'] == {'$ref': 'axes/a0'} and trace['y']['dtype'] in ('i1', 'i2', 'i4')
+    assert 'index' in bundle['figures']['comparison']['data'][1]['x']
+    assert bundle['figures']['France rates']['data'][0]['y']['dtype'] == 'f4'
+
+    res = export.read_bundle(path)
+    assert list(res) == list(figs)
+    for name, fig in figs.items():
+        assert fig.layout.title.text == res[name].layout.title.text
+        for tr, tr_res in zip(fig.data, res[name].data):
+            assert (np.asarray(tr.x, dtype='datetime64[D]') == np.asarray(tr_res.x, dtype='datetime64[D]')).all()
+            np.testing.assert_allclose(np.asarray(tr.y, dtype=float), np.asarray(tr_res.y, dtype=float), rtol=1e-6)
+    assert res['France'].layout.template.layout.font.color == figs['France'].to_dict()['layout']['template']['layout']['font']['color']
+
+    with pytest.raises(ValueError):
+        export.read_bundle('{"format": "plotly"}')
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+# Import time budget for the numeric helpers [us], pandas & numpy included
+IMPORT_BUDGET_US = 1500000
+
+
+# Run a fresh interpreter with -X importtime, return the cumulative time of each module [us]
+def import_times(statement):
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(__file__), os.pardir, 'src')
+    env['PYTHONPATH'] = os.pathsep.join([src, env.get('PYTHONPATH', '')])
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                          stderr=subprocess.PIPE, env=env, universal_newlines=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)', line)
+        if match:
+            times[match.group(3)] = int(match.group(1))
+    return times
+
+
+@pytest.mark.parametrize('module', ['covid19_analysis.dataFun', 'covid19_analysis.dataPlot'])
+def test_no_plotly_on_import(module):
+    times = import_times('import ' + module)
+    assert module in times
+    assert not any(name.split('.')[0] == 'plotly' for name in times)
+
+
+def test_dataFun_import_budget():
+    times = import_times('import covid19_analysis.dataFun')
+    assert times['covid19_analysis.dataFun'] < IMPORT_BUDGET_US
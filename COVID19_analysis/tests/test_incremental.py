@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+from covid19_analysis import dataFun
+from covid19_analysis.store import JHUStore
+from covid19_analysis.incremental import DerivedProducts
+
+from conftest import make_jhu_frame
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+def test_rolling_sum():
+    data = np.random.RandomState(1).randint(0, 100, size=(3, 40))
+    for window in [4, 7]:
+        expected = pd.DataFrame(data.T).rolling(window, min_periods=1, center=True).sum().values.T
+        assert np.array_equal(dataFun.rolling_sum(data, window), expected)
+    expected = pd.DataFrame(data.T).rolling(7, min_periods=1).sum().values.T
+    assert np.array_equal(dataFun.rolling_sum(data, 7, center=False), expected)
+
+
+def test_refresh_matches_full_build():
+    df_full = make_jhu_frame(n_dates=40)
+    df_old = df_full.iloc[:, :4 + 30].copy()
+    df_recov = make_jhu_frame(n_dates=40, seed=1)
+    df_recov['Country/Region'] = df_full['Country/Region']
+
+    derived = DerivedProducts(JHUStore(df_old), recovered=JHUStore(df_recov.iloc[:, :4 + 30]))
+
+    # corrected historical cell & ten new dates
+    df_full.iloc[2, 4 + 20] += 1000
+    col_from = derived.refresh(df_full, df_recovered=df_recov)
+    assert col_from == 20
+
+    expected = DerivedProducts(JHUStore(df_full), recovered=JHUStore(df_recov))
+    assert np.array_equal(derived.cases.mainland, expected.cases.mainland)
+    for attr in ['daily', 'rolling', 'growth', 'recovery_rate']:
+        assert np.array_equal(getattr(derived, attr), getattr(expected, attr)), attr
+
+    # nothing changed, nothing to update
+    assert derived.refresh(df_full) == 40
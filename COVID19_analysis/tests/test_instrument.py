@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import numpy as np
+import pytest
+
+from covid19_analysis import dataFun, metrics, instrument
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+@pytest.fixture
+def registry():
+    instrument.reset()
+    yield instrument
+    instrument.disable()
+    instrument.reset()
+
+
+def test_disabled(registry):
+    dataFun.safe_div(np.arange(5), np.arange(5))
+    with instrument.span('block'):
+        pass
+    assert instrument.records() == []
+
+
+def test_records(registry, df_jhu):
+    instrument.enable(memory=True)
+    with instrument.span('outer'):
+        metrics.last_daily_cases(df_jhu, ['France', 'Italy'], num_days=10)
+    with instrument.span('block', rows=3):
+        np.ones(10**5)
+    instrument.disable()
+
+    rec = instrument.records()
+    names = [r['name'] for r in rec]
+    assert names == ['dataFun.get_countries_matrix', 'dataFun.daily_increments', 'dataFun.rolling_sum',
+                     'dataFun.last_daily_matrix', 'outer', 'block']
+
+    assert rec[0]['rows'] == len(df_jhu) and rec[0]['depth'] == 1 and rec[1]['depth'] == 2 and rec[4]['depth'] == 0
+    assert rec[4]['duration'] >= rec[0]['duration'] + rec[3]['duration']
+    assert rec[-1]['rows'] == 3 and rec[-1]['bytes'] >= 8 * 10**5
+    assert rec[4]['bytes'] >= max(r['bytes'] for r in rec[:4])
+
+    assert instrument.summary()['dataFun.rolling_sum']['calls'] == 1
+    assert len(json.loads(instrument.to_json())['records']) == len(rec)
+    events = json.loads(instrument.to_chrome_trace())['traceEvents']
+    assert events[-1]['ph'] == 'X' and events[-1]['dur'] == rec[-1]['duration'] * 1e6
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+
+from covid19_analysis import loader, dataFun, metrics
+
+from conftest import make_jhu_frame
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+def test_jhu_long_wide(df_jhu):
+    df_long = loader.jhu_long(df_jhu)
+    assert len(df_long) == df_jhu.shape[0] * (df_jhu.shape[1] - 4)
+    assert df_long['value'].dtype == np.int32 and df_long['Country/Region'].dtype == 'category'
+
+    # round trip, empty cells read as zero
+    df_res = loader.jhu_wide(df_long)
+    pd.testing.assert_frame_equal(df_res, df_jhu.fillna({c: 0 for c in df_jhu.columns[4:]}), check_dtype=False)
+
+
+def test_cached_table(df_jhu, tmp_path):
+    calls = []
+
+    def parser(raw):
+        calls.append(raw)
+        return loader._parse_jhu(raw)
+
+    raw = df_jhu.to_csv(index=False).encode()
+    cache_dir = str(tmp_path)
+    df_miss = loader.cached_table('jhu_test', raw, parser, cache_dir)
+    df_hit = loader.cached_table('jhu_test', raw, parser, cache_dir)
+    assert len(calls) == 1 and len(list(tmp_path.iterdir())) == 1
+    pd.testing.assert_frame_equal(df_hit, df_miss)
+    # numeric columns are read from the mapped file
+    assert not df_hit['value'].to_numpy().flags.writeable
+
+    # new file content or another parser: parsed again
+    loader.cached_table('jhu_test', raw.replace(b'France', b'Francia'), parser, cache_dir)
+    loader.cached_table('jhu_test', raw, loader._parse_jhu, cache_dir)
+    assert len(calls) == 2 and len(list(tmp_path.iterdir())) == 3
+
+
+def test_read_jhu(df_jhu, tmp_path):
+    df_jhu.to_csv(str(tmp_path / loader.JHU_FILES['deaths']), index=False)
+    df_long = loader.read_jhu('deaths', str(tmp_path), cache_dir=str(tmp_path / 'cache'))
+    pd.testing.assert_frame_equal(df_long, loader.jhu_long(df_jhu))
+
+
+def test_read_spf(df_spf, tmp_path):
+    df_spf.to_csv(str(tmp_path / loader.SPF_FILE), index=False)
+    valid = df_spf.loc[df_spf['date'] != '2020-03-xx']
+    for _ in range(2):     # parsed, then read from the cache
+        df_all = loader.read_spf(str(tmp_path), cache_dir=str(tmp_path / 'cache'))
+        assert len(df_all) == len(df_spf) - 1 and df_all['date'].notna().all()
+        assert df_all['maille_code'].dtype == 'category' and df_all['cas_confirmes'].dtype == 'Int32'
+        assert df_all['deces'].isna().sum() == valid['deces'].isna().sum()
+        assert df_all['cas_confirmes'].sum() == valid['cas_confirmes'].sum()
+
+
+def test_read_spf_chunks(df_spf, tmp_path):
+    df_spf.to_csv(str(tmp_path / loader.SPF_FILE), index=False)
+    df_all = loader.read_spf_chunks(str(tmp_path), usecols=None, chunksize=50)
+    assert len(df_all) == len(df_spf) - 1   # malformed date dropped
+    assert df_all['granularite'].dtype == 'category' and df_all['deces'].dtype == 'Int32'
+
+    df_reg = loader.read_spf_chunks(str(tmp_path), granularites=['region'], sources=['Santé publique France'],
+                                    chunksize=7)
+    ref = df_all.loc[(df_all.granularite == 'region') & (df_all.source_nom == 'Santé publique France')]
+    assert set(df_reg.columns) == set(loader.SPF_STREAM_COLUMNS) - {'reanimation', 'hospitalises'}
+    assert (df_reg['cas_confirmes'].values == ref['cas_confirmes'].values).all()
+
+
+def test_spf_store(df_spf, tmp_path):
+    df_spf.to_csv(str(tmp_path / loader.SPF_FILE), index=False)
+    store = loader.read_spf_store(str(tmp_path))
+    df_all = store.frame
+
+    df_dep = store.get('Savoie', source='ARS Auvergne-Rhône-Alpes')
+    ref = df_all.loc[(df_all.maille_nom == 'Savoie') & (df_all.source_nom == 'ARS Auvergne-Rhône-Alpes')]
+    assert df_dep['date'].is_monotonic_increasing
+    assert (df_dep['cas_confirmes'].values == ref.sort_values('date')['cas_confirmes'].values).all()
+
+    assert store.key('DEP-73') == ('departement', 'DEP-73')
+    assert store.key('Mayotte', 'departement') == ('departement', 'DEP-976')
+    assert sorted(store.names('region')) == ['Auvergne-Rhône-Alpes', 'Mayotte']
+
+
+def test_spf_store_metrics(df_spf, tmp_path):
+    # SPF entry points take a store and the area name as well as the rows of the area
+    df_spf.to_csv(str(tmp_path / loader.SPF_FILE), index=False)
+    store = loader.read_spf_store(str(tmp_path))
+    traces = metrics.growing_ratio_countries(store, 'Savoie', pop_th=10, df_source='SPF')
+    expected = metrics.growing_ratio_countries(store.get('Savoie'), 'Savoie', pop_th=10, df_source='SPF')
+    assert [t.name for t in traces] == ['Cases', 'Fatalities'] and traces[0].y.size > 0
+    for trace, ref in zip(traces, expected):
+        assert (trace.y.values == ref.y.values).all()
+
+
+def test_reconcile_spf(df_spf):
+    df_all = loader._type_spf(df_spf.copy())
+    df_rec = loader.reconcile_spf(df_all)
+    assert not df_rec.duplicated(['granularite', 'maille_code', 'date']).any()
+
+    # ARS first for regions & departments, ministry first for the country
+    def sources(code):
+        return set(df_rec.loc[df_rec.maille_code == code, 'source_nom'].astype(str))
+    assert sources('REG-84') == sources('DEP-73') == {'ARS Auvergne-Rhône-Alpes'}
+    # ministry row with a malformed date, the date is taken from the next source
+    country = df_rec.loc[df_rec.maille_code == 'FRA', 'source_nom'].astype(str)
+    assert (country == 'Ministère des Solidarités et de la Santé').sum() == len(country) - 1
+
+    df_reg = df_rec.loc[df_rec.maille_code == 'REG-84']
+    ref = df_all.loc[(df_all.maille_code == 'REG-84') & (df_all.source_nom == 'ARS Auvergne-Rhône-Alpes')].sort_values('date')
+    assert (df_reg['cas_confirmes'].values == ref['cas_confirmes'].values).all()
+    assert df_reg['conflict'].all() and (df_reg['n_sources'] == 3).all()
+
+    # empty deaths taken from the next source or forward filled
+    assert df_rec['deces'].isna().sum() <= df_rec.groupby('maille_code', observed=True).ngroups
+    assert not loader.reconcile_spf(df_all, tolerance=10)['conflict'].any()
+
+
+def test_read_jhu_metrics(tmp_path):
+    # deaths file lags two days and misses a date, recovered file misses Zimbabwe
+    df_c = make_jhu_frame(seed=1)
+    df_d = make_jhu_frame(seed=2).drop(columns=['2/20/20', '2/19/20', '2/1/20'])
+    df_r = make_jhu_frame(seed=3)
+    df_r = df_r.loc[df_r['Country/Region'] != 'Zimbabwe']
+    for metric, df in zip(['confirmed', 'deaths', 'recovered'], [df_c, df_d, df_r]):
+        df.to_csv(str(tmp_path / loader.JHU_FILES[metric]), index=False)
+    aligned = loader.read_jhu_metrics(str(tmp_path), cache_dir=str(tmp_path / 'cache'))
+    assert aligned.data.shape == (3, 8, 30) and not aligned.data.flags.writeable
+
+    ts_c, ts_d = [dataFun.get_timeseries_from_JHU(df, 'China', verbose=False) for df in (df_c, df_d)]
+    df_china = aligned.frame('China')
+    assert df_china.columns.name == 'China'
+    assert np.shares_memory(df_china['cases'].values, aligned.data)
+    assert (df_china['cases'].values == ts_c.values).all()
+    deaths = df_china['death']
+    assert (deaths[ts_d.index].values == ts_d.values).all()
+    assert deaths['2/1/20'] == ts_d['1/31/20'] and (deaths['2/19/20':] == ts_d.iloc[-1]).all()
+
+    ts_case, ts_recov, ts_death = aligned.series('Zimbabwe')
+    assert (ts_recov.values == 0).all() and ts_death.equals(aligned.frame('Zimbabwe')['death'].rename('death'))
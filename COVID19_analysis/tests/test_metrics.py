@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_analysis import dataFun, metrics, figures
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+def test_daily_cases():
+    dates = pd.date_range('2020-03-01', periods=5)
+    df_data = pd.DataFrame({'cases': [2, 5, 4, 10, 10], 'death': [0, 1, 1, 2, 3], 'recov': [0, 0, 1, 1, 4]}, index=dates)
+    res = metrics.daily_cases(df_data, 'JHU')
+    assert res.cases.tolist() == [2, 3, 0, 6, 0]
+    assert res.death.tolist() == [0, 1, 0, 1, 1]
+    assert res.recov.tolist() == [0, 0, 1, 0, 3]
+
+    res = metrics.daily_cases(df_data, 'JHU', mask=dates > '2020-03-02')
+    assert res.dates.equals(dates[2:])
+
+
+def test_country_rates(df_jhu):
+    ts_case = dataFun.get_timeseries_from_JHU(df_jhu, 'Italy', verbose=False)
+    res = metrics.country_rates(ts_case, ts_case // 2, ts_case * 0, mask=0)
+    assert np.allclose(res.recovery[ts_case.values > 0], (ts_case // 2 / ts_case * 100)[ts_case.values > 0])
+    assert (res.fatality == 0).all()
+
+
+def test_countries_comp(df_jhu, capsys):
+    res = metrics.countries_comp(df_jhu, ['France', 'Italy'])
+    assert 'Only mainland was taken for France' in capsys.readouterr().out
+    metrics.countries_comp(df_jhu, ['France', 'Italy'], verbose=False)
+    assert capsys.readouterr().out == ''
+    for c_idx, c in enumerate(res.names):
+        assert (res.data[c_idx] == dataFun.get_timeseries_from_JHU(df_jhu, c, verbose=False).values).all()
+
+    # decimated: one dates row per country
+    res_d = metrics.countries_comp(df_jhu, ['France', 'Italy'], max_points=10, method='minmax')
+    assert res_d.dates.shape == res_d.data.shape == (2, 10)
+    for c_idx in range(2):
+        pos = res.dates.get_indexer(res_d.dates[c_idx])
+        assert (res_d.data[c_idx] == res.data[c_idx, pos]).all()
+
+
+def test_doubling_references():
+    refs = metrics.doubling_references(50, 20)
+    for gr_idx, gr_value in enumerate(metrics.DOUBLING_RATES):
+        assert (refs.curves[gr_idx] == dataFun.doubling_time_fun(50, 20, gr_value)).all()
+    assert refs.annotations[0][1] == np.log10(dataFun.doubling_time_equation(50, 9, 1))
+
+    # memoized & read-only
+    assert metrics.doubling_references(50, 20, list(metrics.DOUBLING_RATES)) is refs
+    assert not refs.curves.flags.writeable
+
+
+def test_doubling_template():
+    pytest.importorskip('plotly')
+    fig = figures.doubling_template()
+    fig.update_layout(title='France')
+    fig.add_annotation(x=1, y=1, text='new')
+    fig_ref = figures.doubling_template()
+    assert fig_ref.layout.title.text is None
+    assert len(fig_ref.layout.annotations) == len(metrics.DOUBLING_ANNOTATIONS)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid19_analysis import models, metrics
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+def test_solve_sir_batch():
+    beta = np.array([.3, .5, .8])
+    res = models.solve_sir(100000, beta, .16)
+    assert res.I.shape == (3, 81)
+    assert np.allclose(res.S + res.I + res.R, 100000)
+
+    # each scenario is the same as a single solve
+    single = models.solve_sir(100000, .5, .16)
+    assert np.allclose(res.I[1], single.I[0])
+
+    # default time grid built per call, changing a result does not leak into the next solves
+    single.t[:] = 0
+    assert np.array_equal(models.solve_sir(100000, .5, .16).t, np.linspace(0, 80, 81))
+
+    # higher contact rate, earlier & higher peak
+    assert (np.diff(res.I.max(axis=1)) > 0).all()
+    assert (np.diff(res.I.argmax(axis=1)) < 0).all()
+
+
+def test_solve_sir_odeint():
+    odeint = pytest.importorskip('scipy.integrate').odeint
+
+    def deriv(y, t, N, beta, gamma):
+        S, I, R = y
+        return -beta * S * I / N, beta * S * I / N - gamma * I, gamma * I
+
+    t = np.linspace(0, 80, 81)
+    expected = odeint(deriv, (99999, 1, 0), t, args=(100000, .5, .16)).T
+    res = models.solve_sir(100000, .5, .16, t=t)
+    assert np.allclose(res.I[0], expected[1], rtol=1e-3, atol=1)
+
+
+def test_solve_seir_sharded():
+    beta, sigma = np.meshgrid([.4, .6], [.2, .5])
+    res = models.solve_seir(10000, beta.ravel(), .16, sigma.ravel(), n_jobs=2)
+    serial = models.solve_seir(10000, beta.ravel(), .16, sigma.ravel())
+    assert np.array_equal(res.I, serial.I)
+    assert np.allclose(res.S + res.E + res.I + res.R, 10000)
+
+    # output plugs into the growth rates metrics
+    growth = metrics.growth_rates(models.to_frame(res, 'I')[0])
+    assert growth.ratio.size == 80
+
+
+def test_calibrate_sir():
+    # synthetic countries following a known SIR, one never reaching the threshold
+    N = np.array([1e6, 5e5, 1e6])
+    truth = models.solve_sir(N[:2], np.array([.4, .6]), np.array([.1, .2]), I0=20, t=np.arange(60))
+    data = np.vstack([N[:2, None] - truth.S, np.full((1, 60), 5.)])
+    data = pd.DataFrame(np.hstack([np.zeros((3, 5)), data]), index=['A', 'B', 'C'])
+
+    fit = models.calibrate_sir(data, N, start_th=10)
+    assert np.allclose(fit.loc[['A', 'B'], 'beta'], [.4, .6], rtol=1e-2)
+    assert np.allclose(fit.loc[['A', 'B'], 'gamma'], [.1, .2], rtol=1e-2)
+    assert fit.loc['C'].isna().all()
+    # fit time per country: shared batched iterations, B alone for its last iterations
+    assert (fit.loc[['A', 'B'], 'fit_time'] > 0).all()
+    assert fit.loc['A', 'n_iter'] < fit.loc['B', 'n_iter'] and fit.loc['A', 'fit_time'] < fit.loc['B', 'fit_time']
+
+    # warm start from the previous fit converges at once, same results with worker processes
+    warm = models.calibrate_sir(data, N, start_th=10, p0=fit, n_jobs=2)
+    assert (warm.loc[['A', 'B'], 'n_iter'] <= fit.loc[['A', 'B'], 'n_iter']).all()
+    assert np.allclose(warm.loc[['A', 'B'], 'beta'], fit.loc[['A', 'B'], 'beta'], rtol=1e-3)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from covid19_analysis import population
+from covid19_analysis.store import JHUStore
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Country/Region names of the JHU global time series (final release, 2023-03-10)
+JHU_COUNTRIES = [
+    'Afghanistan', 'Albania', 'Algeria', 'Andorra', 'Angola', 'Antarctica', 'Antigua and Barbuda', 'Argentina',
+    'Armenia', 'Australia', 'Austria', 'Azerbaijan', 'Bahamas', 'Bahrain', 'Bangladesh', 'Barbados', 'Belarus',
+    'Belgium', 'Belize', 'Benin', 'Bhutan', 'Bolivia', 'Bosnia and Herzegovina', 'Botswana', 'Brazil', 'Brunei',
+    'Bulgaria', 'Burkina Faso', 'Burma', 'Burundi', 'Cabo Verde', 'Cambodia', 'Cameroon', 'Canada',
+    'Central African Republic', 'Chad', 'Chile', 'China', 'Colombia', 'Comoros', 'Congo (Brazzaville)',
+    'Congo (Kinshasa)', 'Costa Rica', "Cote d'Ivoire", 'Croatia', 'Cuba', 'Cyprus', 'Czechia', 'Denmark',
+    'Diamond Princess', 'Djibouti', 'Dominica', 'Dominican Republic', 'Ecuador', 'Egypt', 'El Salvador',
+    'Equatorial Guinea', 'Eritrea', 'Estonia', 'Eswatini', 'Ethiopia', 'Fiji', 'Finland', 'France', 'Gabon',
+    'Gambia', 'Georgia', 'Germany', 'Ghana', 'Greece', 'Grenada', 'Guatemala', 'Guinea', 'Guinea-Bissau', 'Guyana',
+    'Haiti', 'Holy See', 'Honduras', 'Hungary', 'Iceland', 'India', 'Indonesia', 'Iran', 'Iraq', 'Ireland',
+    'Israel', 'Italy', 'Jamaica', 'Japan', 'Jordan', 'Kazakhstan', 'Kenya', 'Kiribati', 'Korea, North',
+    'Korea, South', 'Kosovo', 'Kuwait', 'Kyrgyzstan', 'Laos', 'Latvia', 'Lebanon', 'Lesotho', 'Liberia', 'Libya',
+    'Liechtenstein', 'Lithuania', 'Luxembourg', 'MS Zaandam', 'Madagascar', 'Malawi', 'Malaysia', 'Maldives',
+    'Mali', 'Malta', 'Marshall Islands', 'Mauritania', 'Mauritius', 'Mexico', 'Micronesia', 'Moldova', 'Monaco',
+    'Mongolia', 'Montenegro', 'Morocco', 'Mozambique', 'Namibia', 'Nauru', 'Nepal', 'Netherlands', 'New Zealand',
+    'Nicaragua', 'Niger', 'Nigeria', 'North Macedonia', 'Norway', 'Oman', 'Pakistan', 'Palau', 'Panama',
+    'Papua New Guinea', 'Paraguay', 'Peru', 'Philippines', 'Poland', 'Portugal', 'Qatar', 'Romania', 'Russia',
+    'Rwanda', 'Saint Kitts and Nevis', 'Saint Lucia', 'Saint Vincent and the Grenadines', 'Samoa', 'San Marino',
+    'Sao Tome and Principe', 'Saudi Arabia', 'Senegal', 'Serbia', 'Seychelles', 'Sierra Leone', 'Singapore',
+    'Slovakia', 'Slovenia', 'Solomon Islands', 'Somalia', 'South Africa', 'South Sudan', 'Spain', 'Sri Lanka',
+    'Sudan', 'Summer Olympics 2020', 'Suriname', 'Sweden', 'Switzerland', 'Syria', 'Taiwan*', 'Tajikistan',
+    'Tanzania', 'Thailand', 'Timor-Leste', 'Togo', 'Tonga', 'Trinidad and Tobago', 'Tunisia', 'Turkey', 'Tuvalu',
+    'US', 'Uganda', 'Ukraine', 'United Arab Emirates', 'United Kingdom', 'Uruguay', 'Uzbekistan', 'Vanuatu',
+    'Venezuela', 'Vietnam', 'West Bank and Gaza', 'Winter Olympics 2022', 'Yemen', 'Zambia', 'Zimbabwe',
+]
+# JHU entries without a population: not a state, or not in the World Bank table
+JHU_NON_STATES = {'Antarctica', 'Diamond Princess', 'MS Zaandam', 'Summer Olympics 2020', 'Winter Olympics 2022'}
+JHU_NO_WORLD_BANK = {'Holy See', 'Taiwan*'}
+
+
+def test_aliases():
+    wb = population.read_world_bank()
+    assert set(population.JHU_ALIASES.values()) <= set(wb.codes)
+    assert (wb.year[wb.codes.get_indexer(['FRA', 'USA'])] == 2018).all()
+
+    pop = population.country_population(['France', 'Korea, South', 'Diamond Princess'])
+    assert pop[0] > 60e6 and pop[1] > 50e6 and np.isnan(pop[2])
+    assert population.country_population(('France', 'Korea, South', 'Diamond Princess')) is pop
+
+
+def test_per_capita(df_jhu):
+    store = JHUStore(df_jhu)
+    res = population.per_capita(store, verbose=False)
+    pop = population.country_population(store.countries)
+    c_idx = store.country_index('Italy')
+    assert res.shape == store.mainland.shape
+    assert np.allclose(res[c_idx], store.mainland[c_idx] / pop[c_idx] * 100000)
+
+    res = population.per_capita(store.provinces_sum, store.countries, per=1, verbose=False)
+    assert np.allclose(res * pop[:, np.newaxis], store.provinces_sum)
+
+
+def test_jhu_countries():
+    pop = population.country_population(JHU_COUNTRIES)
+    missing = {c for c, p in zip(JHU_COUNTRIES, pop) if np.isnan(p)}
+    assert missing == JHU_NON_STATES | JHU_NO_WORLD_BANK
+    assert pop[JHU_COUNTRIES.index('Korea, North')] > 20e6
+
+
+def test_world_bank_source(monkeypatch, tmp_path):
+    bundled = population.world_bank_source()
+    monkeypatch.setenv(population.WB_ENV, str(tmp_path))
+    assert population.world_bank_source() == str(tmp_path)
+    assert population.world_bank_source(bundled) == bundled
+
+    # installed package: no source checkout next to the module
+    monkeypatch.delenv(population.WB_ENV)
+    monkeypatch.setattr(population, 'WB_DIR', str(tmp_path))
+    with pytest.raises(FileNotFoundError, match=population.WB_ENV):
+        population.read_world_bank()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import numpy as np
+
+from covid19_analysis import render
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Worker tasks (module level so they can be pickled)
+def row_sum(spec, row):
+    return int(render.attach_array(spec)[row].sum())
+
+
+def slow_or_failing(value):
+    if value < 0:
+        raise ValueError('negative value')
+    time.sleep(value)
+    return value
+
+
+def test_shared_array():
+    data = np.arange(12, dtype=np.int32).reshape(3, 4)
+    with render.SharedArray(data) as shared:
+        res = render.RenderScheduler(max_workers=2).run(row_sum, ((r, (shared.spec, r)) for r in range(3)))
+    assert res.results == {0: 6, 1: 22, 2: 38}
+    assert res.failures == {}
+
+
+def test_scheduler_failures_and_timeout():
+    scheduler = render.RenderScheduler(max_workers=2, max_pending=2, timeout=1.)
+    res = scheduler.run(slow_or_failing, [('ok', (0,)), ('error', (-1,)), ('slow', (3,)), ('ok2', (0,))])
+    assert 'ValueError' in res.failures['error']
+    assert 'TimeoutError' in res.failures['slow']
+    assert set(res.failures) == {'error', 'slow'}
+    # the timed out task still ran to its end, its result is kept
+    assert res.results == {'ok': 0, 'ok2': 0, 'slow': 3}
+
+
+def test_scheduler_timeout_queued():
+    # tasks waiting behind a busy worker: the timeout only runs from the task start
+    scheduler = render.RenderScheduler(max_workers=1, max_pending=3, timeout=.8)
+    res = scheduler.run(slow_or_failing, [(k, (.5,)) for k in range(4)])
+    assert res.failures == {}
+    assert res.results == {k: .5 for k in range(4)}
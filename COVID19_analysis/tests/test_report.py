@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+from covid19_analysis import report
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+def test_parse_args():
+    args = report.parse_args(['-d', 'data', '-c', 'France', 'Italy', '-f', 'json', 'html', '-w', '3'])
+    assert args.data_dir == 'data'
+    assert args.countries == ['France', 'Italy']
+    assert args.formats == ['json', 'html']
+    assert args.workers == 3
+    assert args.timeout is None
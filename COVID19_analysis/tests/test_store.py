@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import tracemalloc
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from covid19_analysis import store as jhu_store
+from covid19_analysis.store import JHUStore
+
+from conftest import make_jhu_frame
+
+__author__ = "J SAYRITUPAC"
+__copyright__ = "J SAYRITUPAC"
+__license__ = "mit"
+
+
+# Counts of some rows of the JHU dataframe, empty cells as zero
+def rows_sum(df_jhu, rows):
+    return df_jhu.loc[rows, df_jhu.columns[4:]].fillna(0).sum().values
+
+
+def test_lookup(df_jhu):
+    store = JHUStore(df_jhu)
+    assert list(store.countries) == sorted(df_jhu['Country/Region'].unique())
+    assert store.dates.equals(pd.date_range('2020-01-22', periods=df_jhu.shape[1] - 4))
+
+    # each country is a contiguous slice of the sorted regions
+    for c_idx, country in enumerate(store.countries):
+        assert store.country_index(country) == c_idx
+        rows = store.order[store.starts[c_idx]:store.stops[c_idx]]
+        assert set(rows) == set(np.flatnonzero(df_jhu['Country/Region'] == country))
+    with pytest.raises(KeyError):
+        store.country_index('Atlantis')
+
+
+def test_rules(df_jhu, capsys):
+    store = JHUStore(df_jhu)
+    rules = dict(zip(store.countries, store.rules))
+    assert rules['Italy'] == rules['Brazil'] == jhu_store.RULE_SINGLE
+    assert rules['France'] == rules['Canada'] == jhu_store.RULE_MAINLAND
+    assert rules['China'] == rules['Australia'] == rules['US'] == jhu_store.RULE_SUM
+
+    country = df_jhu['Country/Region']
+    for c in ['France', 'China', 'Italy']:
+        ts_main = store.get_timeseries(c, verbose=False)
+        ts_all = store.get_timeseries(c, mainland=False)
+        assert (ts_all.values == rows_sum(df_jhu, country == c)).all()
+        if c == 'France':    # mainland: the row without Province/State
+            assert (ts_main.values == rows_sum(df_jhu, (country == c) & df_jhu['Province/State'].isna())).all()
+        else:
+            assert ts_main.equals(ts_all)
+    assert (store.get_timeseries('all').values == rows_sum(df_jhu, country.notna())).all()
+
+    store.get_timeseries('France')
+    assert 'Only mainland was taken for France' in capsys.readouterr().out
+
+
+def test_us_states(df_jhu):
+    store = JHUStore(df_jhu)
+    us = df_jhu['Country/Region'] == 'US'
+    # counties ('King County, WA') are left out of the mainland sum, kept in the sum of all provinces
+    states = us & ~df_jhu['Province/State'].str.contains(', ', na=False)
+    assert (store.get_timeseries('US', verbose=False).values == rows_sum(df_jhu, states)).all()
+    assert (store.get_timeseries('US', mainland=False).values == rows_sum(df_jhu, us)).all()
+    assert store._keep.sum() == len(df_jhu) - 1
+
+
+def test_refresh_shared_dates(df_jhu):
+    cases = JHUStore(df_jhu)
+    deaths = JHUStore(df_jhu, dates=cases.dates)
+    assert deaths.dates is cases.dates
+
+    # region change: the store is rebuilt on the same dates index
+    df_new = df_jhu.loc[df_jhu['Country/Region'] != 'Zimbabwe'].reset_index(drop=True)
+    assert deaths.refresh(df_new) == 0
+    assert deaths.dates is cases.dates and 'Zimbabwe' not in deaths.countries
+    assert deaths.get_timeseries('China', verbose=False).equals(cases.get_timeseries('China', verbose=False))
+
+    # new dates & region change: the rebuilt store follows its refreshed sibling
+    df_ext = df_jhu.copy()
+    df_ext['2/21/20'] = df_ext['2/20/20']
+    cases.refresh(df_ext)
+    assert cases.dates.size == df_jhu.shape[1] - 3
+    assert deaths.refresh(df_ext.iloc[::-1].reset_index(drop=True), dates=cases.dates) == 0
+    assert deaths.dates is cases.dates
+
+    # nothing new: the dates index is kept
+    dates = deaths.dates
+    deaths.refresh(df_ext.iloc[::-1].reset_index(drop=True))
+    assert deaths.dates is dates
+
+
+def test_compact_memory(df_jhu):
+    # the source dataframe is neither referenced nor shared by the store
+    compact = JHUStore(df_jhu, dtype=np.int32)
+    assert compact._frame is None
+    assert not np.shares_memory(compact._labels.iloc[:, 2:].to_numpy(), df_jhu.iloc[:, 2:4].to_numpy())
+    assert compact.frame.shape == df_jhu.shape
+
+    # memory kept once the source dataframe is released matches nbytes (large counts matrix, few countries)
+    tracemalloc.start()
+    try:
+        gc.collect()
+        base = tracemalloc.get_traced_memory()[0]
+        df_big = pd.concat([make_jhu_frame(n_dates=500)] * 200, ignore_index=True)
+        compact = JHUStore(df_big, dtype=np.int32)
+        del df_big
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    assert compact.nbytes <= used < 1.1 * compact.nbytes